@@ -0,0 +1,138 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+
+SHARED_TOKEN_KEY = 'auth_token:{digest}'
+SHARED_STATS_KEY = 'auth_token_stats:{name}'
+STATS_NAMES = ('hits', 'misses')
+STATS_FLUSH_INTERVAL = 100
+
+
+def get_token_cache_settings():
+    return {
+        'MAX_SIZE': 10000,
+        'TTL': 60,
+        'SHARED': True,
+        **getattr(settings, 'TOKEN_CACHE', {}),
+    }
+
+
+class TokenCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(key):
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, key):
+        digest = self.digest(key)
+        if get_token_cache_settings()['SHARED']:
+            value = cache.get(SHARED_TOKEN_KEY.format(digest=digest))
+        else:
+            value = self.get_local(digest)
+        self.count(value is not None)
+        return value
+
+    def get_local(self, digest):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(digest)
+            if entry is None:
+                return None
+            if entry[0] < now:
+                del self.entries[digest]
+                return None
+            self.entries.move_to_end(digest)
+            return entry[1]
+
+    def set(self, key, value):
+        options = get_token_cache_settings()
+        digest = self.digest(key)
+        if options['SHARED']:
+            cache.set(SHARED_TOKEN_KEY.format(digest=digest), value,
+                      options['TTL'])
+            return
+        with self.lock:
+            self.entries[digest] = (time.monotonic() + options['TTL'], value)
+            self.entries.move_to_end(digest)
+            while len(self.entries) > options['MAX_SIZE']:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, *keys):
+        digests = [self.digest(key) for key in keys]
+        with self.lock:
+            for digest in digests:
+                self.entries.pop(digest, None)
+        if get_token_cache_settings()['SHARED']:
+            cache.delete_many([
+                SHARED_TOKEN_KEY.format(digest=digest) for digest in digests
+            ])
+
+    def count(self, hit):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            if self.hits + self.misses < STATS_FLUSH_INTERVAL:
+                return
+        self.flush_stats()
+
+    def flush_stats(self):
+        with self.lock:
+            counts = {'hits': self.hits, 'misses': self.misses}
+            self.hits = self.misses = 0
+        for name, value in counts.items():
+            if not value:
+                continue
+            key = SHARED_STATS_KEY.format(name=name)
+            if cache.add(key, value, None):
+                continue
+            try:
+                cache.incr(key, value)
+            except ValueError:
+                cache.set(key, value, None)
+
+    def stats(self):
+        self.flush_stats()
+        shared = cache.get_many([
+            SHARED_STATS_KEY.format(name=name) for name in STATS_NAMES
+        ])
+        stats = {
+            name: shared.get(SHARED_STATS_KEY.format(name=name), 0)
+            for name in STATS_NAMES
+        }
+        total = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / total, 3) if total else None
+        return stats
+
+    def reset_stats(self):
+        with self.lock:
+            self.hits = self.misses = 0
+        cache.delete_many([
+            SHARED_STATS_KEY.format(name=name) for name in STATS_NAMES
+        ])
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is None:
+            cached = super().authenticate_credentials(key)
+            token_cache.set(key, cached)
+        user, token = cached
+        return copy.copy(user), token
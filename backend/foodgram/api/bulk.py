@@ -0,0 +1,139 @@
+from django.db import transaction
+from recipes.counters import change_counters
+from recipes.models import Favorite, Follow, Recipe, ShoppingList
+from recipes.timelines import backfill_timeline, remove_from_timeline
+from users.models import User
+
+from .shopping_cart import bump_cart_version
+from .user_state import reset_user_state
+
+CREATED = 'created'
+DELETED = 'deleted'
+EXISTS = 'exists'
+MISSING = 'missing'
+NOT_FOUND = 'not_found'
+SELF = 'self'
+
+
+class BulkRelation:
+    model = None
+    target_model = None
+    target_field = None
+    counter_field = None
+    messages = {}
+
+    def get_targets(self, user, ids):
+        return set(self.target_model.objects.filter(
+            id__in=ids
+        ).values_list('id', flat=True))
+
+    def get_linked(self, user, ids):
+        return set(self.model.objects.filter(
+            user=user, **{f'{self.target_field}_id__in': ids}
+        ).values_list(f'{self.target_field}_id', flat=True))
+
+    def get_results(self, user, ids, statuses):
+        results = []
+        for pk in ids:
+            result = {'id': pk, 'status': statuses.get(pk, NOT_FOUND)}
+            if result['status'] in self.messages:
+                result['detail'] = self.messages[result['status']]
+            results.append(result)
+        return results
+
+    def changed(self, user, ids, added):
+        reset_user_state(user.id)
+
+    def add(self, user, ids):
+        targets = self.get_targets(user, ids)
+        with transaction.atomic():
+            existing = self.get_linked(user, targets)
+            self.model.objects.bulk_create([
+                self.model(user=user, **{f'{self.target_field}_id': pk})
+                for pk in targets - existing
+            ], ignore_conflicts=True)
+            created = self.get_linked(user, targets) - existing
+            change_counters(self.target_model, created, self.counter_field, 1)
+        if created:
+            self.changed(user, created, added=True)
+        return self.get_results(user, ids, {
+            **dict.fromkeys(targets, EXISTS),
+            **dict.fromkeys(created, CREATED),
+        })
+
+    def remove(self, user, ids):
+        with transaction.atomic():
+            deleted = self.get_linked(user, ids)
+            self.model.objects.filter(
+                user=user, **{f'{self.target_field}_id__in': deleted}
+            ).delete()
+            change_counters(self.target_model, deleted, self.counter_field,
+                            -1)
+        if deleted:
+            self.changed(user, deleted, added=False)
+        return self.get_results(user, ids, {
+            **dict.fromkeys(ids, MISSING),
+            **dict.fromkeys(deleted, DELETED),
+        })
+
+
+class BulkFavorites(BulkRelation):
+    model = Favorite
+    target_model = Recipe
+    target_field = 'recipe'
+    counter_field = 'favorites_count'
+    messages = {
+        EXISTS: 'Вы уже добавили в избранное!',
+        MISSING: 'Рецепта нет в избранном!',
+        NOT_FOUND: 'Рецепт не найден!',
+    }
+
+
+class BulkShoppingCart(BulkRelation):
+    model = ShoppingList
+    target_model = Recipe
+    target_field = 'recipe'
+    counter_field = 'in_carts_count'
+    messages = {
+        EXISTS: 'Вы уже добавили в список покупок!',
+        MISSING: 'Рецепта нет в списке покупок!',
+        NOT_FOUND: 'Рецепт не найден!',
+    }
+
+    def changed(self, user, ids, added):
+        bump_cart_version(user.id)
+        super().changed(user, ids, added)
+
+
+class BulkSubscriptions(BulkRelation):
+    model = Follow
+    target_model = User
+    target_field = 'author'
+    counter_field = 'followers_count'
+    messages = {
+        EXISTS: 'Вы уже подписаны на автора!',
+        MISSING: 'Вы не подписаны на этого автора!',
+        NOT_FOUND: 'Автор не найден!',
+        SELF: 'Вы не можете подписаться на себя!',
+    }
+
+    def get_targets(self, user, ids):
+        return super().get_targets(user, ids) - {user.id}
+
+    def get_results(self, user, ids, statuses):
+        if user.id in ids and user.id not in statuses:
+            statuses = {**statuses, user.id: SELF}
+        return super().get_results(user, ids, statuses)
+
+    def changed(self, user, ids, added):
+        for author_id in ids:
+            if added:
+                backfill_timeline(user.id, author_id)
+            else:
+                remove_from_timeline(user.id, author_id)
+        super().changed(user, ids, added)
+
+
+favorites = BulkFavorites()
+shopping_cart = BulkShoppingCart()
+subscriptions = BulkSubscriptions()
@@ -0,0 +1,70 @@
+import hashlib
+import json
+import math
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+
+from .user_state import get_user_state
+
+
+class ConditionalResponseMixin:
+    conditional_actions = ('list', 'retrieve')
+    user_dependent = True
+
+    def get_validator_parts(self):
+        return None
+
+    def get_last_modified(self):
+        return None
+
+    def get_validators(self):
+        parts = self.get_validator_parts()
+        if parts is None:
+            return None, None
+        last_modified = self.get_last_modified()
+        if self.user_dependent and self.request.user.is_authenticated:
+            state = get_user_state(self.request)
+            parts = [*parts, state.digest()]
+            if last_modified is not None:
+                last_modified = max(last_modified, state.loaded_at)
+        etag = quote_etag(hashlib.md5(
+            json.dumps(parts, sort_keys=True).encode()
+        ).hexdigest())
+        if last_modified is not None:
+            last_modified = math.ceil(last_modified)
+        return etag, last_modified
+
+    def set_validators(self, response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        if self.user_dependent:
+            patch_vary_headers(response, ('Authorization',))
+
+    def render_response(self, render, *args, **kwargs):
+        return render(self.request, *args, **kwargs)
+
+    def conditional_response(self, render, *args, **kwargs):
+        if (self.action not in self.conditional_actions
+                or self.request.method not in ('GET', 'HEAD')):
+            return render(self.request, *args, **kwargs)
+        etag, last_modified = self.get_validators()
+        if etag is None:
+            return render(self.request, *args, **kwargs)
+        response = get_conditional_response(
+            self.request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = self.render_response(render, *args, **kwargs)
+        if response.status_code in (status.HTTP_200_OK,
+                                    status.HTTP_304_NOT_MODIFIED):
+            self.set_validators(response, etag, last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, *args, **kwargs)
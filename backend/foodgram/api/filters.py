@@ -1,12 +1,32 @@
+from django.db.models import Count, Exists, OuterRef
 from django_filters import rest_framework as filters
-from recipes.models import Recipe
+from recipes import catalogue
+from recipes.models import Favorite, Recipe, ShoppingList
+from recipes.search import search_recipes
+
+TAGS_MODE_CHOICES = (
+    ('any', 'Любой из тегов'),
+    ('all', 'Все теги'),
+)
+
+
+def get_tag_choices():
+    return [(tag.slug, tag.name) for tag in catalogue.tags.all()]
 
 
 class RecipeFilter(filters.FilterSet):
-    is_favorited = filters.Filter(field_name='is_favorited')
-    is_in_shopping_cart = filters.Filter(field_name='is_in_shopping_cart')
+    is_favorited = filters.BooleanFilter(method='filter_is_favorited')
+    is_in_shopping_cart = filters.BooleanFilter(
+        method='filter_is_in_shopping_cart'
+    )
     author = filters.Filter(field_name='author__id')
-    tags = filters.AllValuesMultipleFilter(field_name='tags__slug')
+    tags = filters.MultipleChoiceFilter(
+        choices=get_tag_choices, method='filter_tags'
+    )
+    tags_mode = filters.ChoiceFilter(
+        choices=TAGS_MODE_CHOICES, method='filter_tags_mode'
+    )
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Recipe
@@ -14,5 +34,43 @@ class RecipeFilter(filters.FilterSet):
             'is_favorited',
             'is_in_shopping_cart',
             'author',
-            'tags'
+            'tags',
+            'tags_mode',
+            'search'
         ]
+
+    def filter_user_recipes(self, queryset, model, value):
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.none() if value else queryset
+        recipe_ids = model.objects.filter(user=user).values('recipe_id')
+        if value:
+            return queryset.filter(id__in=recipe_ids)
+        return queryset.exclude(id__in=recipe_ids)
+
+    def filter_is_favorited(self, queryset, name, value):
+        return self.filter_user_recipes(queryset, Favorite, value)
+
+    def filter_is_in_shopping_cart(self, queryset, name, value):
+        return self.filter_user_recipes(queryset, ShoppingList, value)
+
+    def filter_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        tag_ids = catalogue.get_tag_ids(value)
+        recipe_tags = Recipe.tags.through.objects.filter(tag_id__in=tag_ids)
+        if self.form.cleaned_data.get('tags_mode') == 'all':
+            return queryset.filter(id__in=recipe_tags.values(
+                'recipe_id'
+            ).annotate(
+                matched=Count('tag_id')
+            ).filter(matched=len(tag_ids)).values('recipe_id'))
+        return queryset.filter(Exists(recipe_tags.filter(
+            recipe_id=OuterRef('pk')
+        )))
+
+    def filter_tags_mode(self, queryset, name, value):
+        return queryset
+
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
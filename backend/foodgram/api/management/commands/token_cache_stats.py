@@ -0,0 +1,18 @@
+from api.authentication import token_cache
+from django.core.management import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Shows token cache hits and misses collected by all workers"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true')
+
+    def handle(self, *args, **options):
+        stats = token_cache.stats()
+        if options['reset']:
+            token_cache.reset_stats()
+        self.stdout.write(
+            f"Hits: {stats['hits']}, misses: {stats['misses']}, "
+            f"hit rate: {stats['hit_rate']}"
+        )
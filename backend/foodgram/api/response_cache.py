@@ -0,0 +1,107 @@
+import hashlib
+import json
+
+from django.core.cache import cache
+from recipes import catalogue
+from recipes.versions import get_versions, version_timestamp
+from rest_framework import status
+from rest_framework.response import Response
+
+from .conditional import ConditionalResponseMixin
+from .user_state import get_user_state
+
+RESPONSE_CACHE_KEY = 'response:{digest}'
+RESPONSE_CACHE_TIMEOUT = 60 * 10
+CACHEABLE_PARAMS = ('tags', 'tags_mode', 'author', 'ordering', 'page', 'limit',
+                    'cursor', 'count')
+
+
+def strip_user_flags(item):
+    item['is_favorited'] = False
+    item['is_in_shopping_cart'] = False
+    item['author']['is_subscribed'] = False
+
+
+def apply_user_flags(item, state):
+    item['is_favorited'] = state.is_favorited(item['id'])
+    item['is_in_shopping_cart'] = state.is_in_shopping_cart(item['id'])
+    item['author']['is_subscribed'] = state.is_subscribed(
+        item['author']['id']
+    )
+
+
+def get_items(data):
+    if isinstance(data, dict) and 'results' in data:
+        return data['results']
+    if isinstance(data, list):
+        return data
+    return [data]
+
+
+class RecipeResponseCacheMixin(ConditionalResponseMixin):
+
+    def get_cache_params(self):
+        params = self.request.query_params
+        if any(name not in CACHEABLE_PARAMS for name in params):
+            return None
+        return {
+            'tags': sorted(set(params.getlist('tags'))),
+            **{name: params.get(name) for name in CACHEABLE_PARAMS
+               if name != 'tags' and name in params},
+        }
+
+    def get_cache_scopes(self, params):
+        if 'pk' in self.kwargs:
+            return [f'recipe:{self.kwargs["pk"]}']
+        if params.get('author'):
+            return [f'author:{params["author"]}']
+        if params['tags']:
+            return [f'tag:{tag_id}'
+                    for tag_id in catalogue.get_tag_ids(params['tags'])]
+        return ['recipes']
+
+    def get_cache_key(self):
+        params = self.get_cache_params()
+        if params is None:
+            return None
+        scopes = self.get_cache_scopes(params)
+        if params.get('ordering'):
+            scopes.append('rankings')
+        versions = get_versions(*scopes, 'author-profiles')
+        self.cache_versions = [
+            *(versions[scope] for scope in sorted(versions)),
+            catalogue.tags.get_version(),
+            catalogue.ingredients.get_version(),
+        ]
+        digest = hashlib.md5(json.dumps([
+            self.request.build_absolute_uri('/'),
+            self.kwargs.get('pk'),
+            params,
+            self.cache_versions,
+        ], sort_keys=True).encode()).hexdigest()
+        return RESPONSE_CACHE_KEY.format(digest=digest)
+
+    def get_validator_parts(self):
+        self.cache_key = self.get_cache_key()
+        if self.cache_key is None:
+            return None
+        return [self.cache_key]
+
+    def get_last_modified(self):
+        return max(map(version_timestamp, self.cache_versions))
+
+    def render_response(self, render, *args, **kwargs):
+        data = cache.get(self.cache_key)
+        if data is None:
+            response = render(self.request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            data = json.loads(json.dumps(response.data))
+            for item in get_items(data):
+                strip_user_flags(item)
+            cache.set(self.cache_key, data, RESPONSE_CACHE_TIMEOUT)
+        if self.request.user.is_authenticated:
+            state = get_user_state(self.request)
+            for item in get_items(data):
+                apply_user_flags(item, state)
+        return Response(data)
@@ -1,24 +1,56 @@
 import base64
+import binascii
+import tempfile
+from collections import Counter
 
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
 from djoser.serializers import UserSerializer
+from recipes import catalogue
+from recipes.images import get_image_urls, schedule_image_processing
 from recipes.models import (Favorite, Follow, Ingredient, IngredientInRecipe,
                             Recipe, ShoppingList, Tag)
+from recipes.signals import batch_recipe_changes, recipe_rows_changed
 from rest_framework import serializers
 from rest_framework.fields import CurrentUserDefault
 from users.models import User
 
+from .user_state import get_user_state
+
+
+def get_recipes_limit(request):
+    try:
+        recipes_limit = int(request.query_params['recipes_limit'])
+    except (KeyError, ValueError):
+        return None
+    return recipes_limit if recipes_limit > 0 else None
+
+
+class BulkIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False, max_length=100
+    )
+
+    def validate_ids(self, value):
+        return list(dict.fromkeys(value))
+
 
 class ShortRecipeSerializer(serializers.ModelSerializer):
     id = serializers.ReadOnlyField()
     name = serializers.ReadOnlyField()
     image = serializers.ImageField(read_only=True)
+    images = serializers.SerializerMethodField()
     cooking_time = serializers.ReadOnlyField()
 
     class Meta:
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'images', 'cooking_time')
         model = Recipe
 
+    def get_images(self, obj):
+        return get_image_urls(obj, self.context.get('request'))
+
 
 class TagSerializer(serializers.ModelSerializer):
     class Meta:
@@ -33,8 +65,7 @@ class IngredientSerializer(serializers.ModelSerializer):
 
 
 class IngredientInRecipeWriteSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all(),
-                                            source='ingredient.id')
+    id = serializers.IntegerField(source='ingredient.id')
     name = serializers.ReadOnlyField(source='ingredient.name')
     measurement_unit = serializers.ReadOnlyField(
         source='ingredient.measurement_unit'
@@ -66,24 +97,40 @@ class CustomUserSerializer(UserSerializer):
         model = User
 
     def get_is_subscribed(self, obj):
-        if self.context['request'].user.is_authenticated:
-            return Follow.objects.filter(user=self.context['request'].user,
-                                         author=obj).exists()
-        return False
+        return get_user_state(self.context['request']).is_subscribed(obj.id)
 
 
 class RecipeSerializer(serializers.ModelSerializer):
-    is_favorited = serializers.BooleanField(read_only=True)
-    is_in_shopping_cart = serializers.BooleanField(read_only=True)
+    is_favorited = serializers.SerializerMethodField()
+    is_in_shopping_cart = serializers.SerializerMethodField()
     tags = TagSerializer(many=True)
     author = CustomUserSerializer()
     ingredients = IngredientInRecipeSerializer(source='ingredientinrecipe_set',
                                                many=True, read_only=True)
+    images = serializers.SerializerMethodField()
 
     class Meta:
-        exclude = ('pub_date',)
+        exclude = ('pub_date', 'image_sizes', 'favorites_count',
+                   'in_carts_count', 'search_vector', 'fanned_out')
         model = Recipe
 
+    def get_is_favorited(self, obj):
+        return get_user_state(self.context['request']).is_favorited(obj.id)
+
+    def get_is_in_shopping_cart(self, obj):
+        return get_user_state(
+            self.context['request']
+        ).is_in_shopping_cart(obj.id)
+
+    def get_images(self, obj):
+        return get_image_urls(obj, self.context.get('request'))
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if hasattr(instance, 'search_headline'):
+            data['search_headline'] = instance.search_headline
+        return data
+
 
 class ShoppingCardSerializer(serializers.ModelSerializer):
     id = serializers.ReadOnlyField(source='recipe.id')
@@ -169,30 +216,66 @@ class FollowSerializer(serializers.ModelSerializer):
         return data
 
     def get_recipes(self, obj):
-        recipes_limit = self.context['request'].query_params.get(
-            'recipes_limit'
-        )
-        queryset = obj.author.recipes.all()
-        if recipes_limit:
-            queryset = queryset[:int(recipes_limit)]
+        if hasattr(obj.author, 'short_recipes'):
+            queryset = obj.author.short_recipes
+        else:
+            queryset = obj.author.recipes.all()
+            recipes_limit = get_recipes_limit(self.context['request'])
+            if recipes_limit:
+                queryset = queryset[:recipes_limit]
         serializer = ShortRecipeSerializer(queryset, many=True)
         return serializer.data
 
     def get_is_subscribed(self, obj):
-        return Follow.objects.filter(user=self.context['request'].user,
-                                     author=obj.author).exists()
+        return obj.user_id == self.context['request'].user.id
 
     def get_recipes_count(self, obj):
-        return obj.author.recipes.count()
+        return obj.author.recipes_count
+
+
+class IngredientSearchSerializer(serializers.Serializer):
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False, max_length=100
+    )
+    max_missing = serializers.IntegerField(
+        min_value=0, required=False, allow_null=True
+    )
 
 
 class Base64ImageField(serializers.ImageField):
+    default_error_messages = {
+        'invalid_base64': 'Некорректные данные изображения.',
+        'too_large': 'Размер изображения не должен превышать {max_size} байт.',
+    }
+    chunk_size = 64 * 1024
+
+    def decode(self, data):
+        max_size = settings.RECIPE_IMAGE_MAX_SIZE
+        if len(data) // 4 * 3 > max_size + 2:
+            self.fail('too_large', max_size=max_size)
+        file = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        )
+        try:
+            for start in range(0, len(data), self.chunk_size):
+                file.write(base64.b64decode(
+                    data[start:start + self.chunk_size], validate=True
+                ))
+        except (binascii.Error, ValueError):
+            file.close()
+            self.fail('invalid_base64')
+        if file.tell() > max_size:
+            file.close()
+            self.fail('too_large', max_size=max_size)
+        file.seek(0)
+        return file
+
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
             format, imgstr = data.split(';base64,')
             ext = format.split('/')[-1]
 
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            data = File(self.decode(imgstr), name='temp.' + ext)
 
         return super().to_internal_value(data)
 
@@ -202,10 +285,7 @@ class RecipeInputSerializer(serializers.ModelSerializer):
     is_in_shopping_cart = serializers.SerializerMethodField()
     author = CustomUserSerializer(
         read_only=True, default=CurrentUserDefault())
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(),
-        many=True,
-    )
+    tags = serializers.ListField(child=serializers.IntegerField())
     image = Base64ImageField()
     ingredients = IngredientInRecipeWriteSerializer(
         many=True,
@@ -213,10 +293,44 @@ class RecipeInputSerializer(serializers.ModelSerializer):
     )
 
     class Meta:
-        exclude = ('pub_date',)
+        exclude = ('pub_date', 'favorites_count', 'in_carts_count',
+                   'search_vector', 'fanned_out')
         read_only_fields = ('author',)
         model = Recipe
 
+    def validate_tags(self, value):
+        tags = catalogue.tags.in_bulk(value)
+        missing = sorted(set(value) - set(tags))
+        if missing:
+            raise serializers.ValidationError(
+                'Теги не найдены: {0}'.format(', '.join(map(str, missing)))
+            )
+        return [tags[pk] for pk in dict.fromkeys(value)]
+
+    def validate_ingredients(self, value):
+        ids = [ingredient['ingredient']['id'] for ingredient in value]
+        errors = []
+        duplicates = sorted(
+            pk for pk, count in Counter(ids).items() if count > 1
+        )
+        if duplicates:
+            errors.append('Ингредиенты повторяются: {0}'.format(
+                ', '.join(map(str, duplicates))
+            ))
+        ingredients = catalogue.ingredients.in_bulk(ids)
+        missing = sorted(set(ids) - set(ingredients))
+        if missing:
+            errors.append('Ингредиенты не найдены: {0}'.format(
+                ', '.join(map(str, missing))
+            ))
+        if errors:
+            raise serializers.ValidationError(errors)
+        for ingredient in value:
+            ingredient['ingredient']['id'] = ingredients[
+                ingredient['ingredient']['id']
+            ]
+        return value
+
     def get_is_favorited(self, obj):
         return Favorite.objects.filter(user=self.context['request'].user,
                                        recipe=obj).exists()
@@ -232,10 +346,12 @@ class RecipeInputSerializer(serializers.ModelSerializer):
         )
         return serializer.data
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredientinrecipe_set')
         tags = validated_data.pop('tags')
         recipe = Recipe.objects.create(**validated_data)
+        schedule_image_processing(recipe)
         for tag in tags:
             recipe.tags.add(tag)
         datas = []
@@ -248,26 +364,63 @@ class RecipeInputSerializer(serializers.ModelSerializer):
         IngredientInRecipe.objects.bulk_create(datas)
         return recipe
 
+    def update_ingredients(self, instance, ingredients):
+        amounts = {
+            ingredient['ingredient']['id'].id: ingredient['amount']
+            for ingredient in ingredients
+        }
+        to_update = []
+        to_delete = []
+        for row in instance.ingredientinrecipe_set.all():
+            amount = amounts.pop(row.ingredient_id, None)
+            if amount is None:
+                to_delete.append(row.id)
+            elif amount != row.amount:
+                row.amount = amount
+                to_update.append(row)
+        if to_delete:
+            IngredientInRecipe.objects.filter(id__in=to_delete).delete()
+        if to_update:
+            IngredientInRecipe.objects.bulk_update(to_update, ['amount'])
+            recipe_rows_changed(instance.id, ingredients=False)
+        if amounts:
+            IngredientInRecipe.objects.bulk_create(
+                IngredientInRecipe(recipe=instance, ingredient_id=pk,
+                                   amount=amount)
+                for pk, amount in amounts.items()
+            )
+            recipe_rows_changed(instance.id)
+
+    @transaction.atomic
     def update(self, instance, validated_data):
-        instance.image = validated_data.get('image', instance.image)
-        instance.name = validated_data.get('name', instance.name)
-        instance.text = validated_data.get('text', instance.text)
-        instance.cooking_time = validated_data.get('cooking_time',
-                                                   instance.cooking_time)
-        ingredients = validated_data.pop('ingredientinrecipe_set')
-        tags = validated_data.pop('tags')
-        tags_lst = []
-        for tag in tags:
-            tags_lst.append(tag)
-        instance.tags.set(tags_lst)
-        instance.ingredients.set([])
-        instance.save()
-        datas = []
-        for ingredient in ingredients:
-            datas.append(IngredientInRecipe(
-                recipe=instance,
-                ingredient=ingredient['ingredient']['id'],
-                amount=ingredient['amount']
-            ))
-        IngredientInRecipe.objects.bulk_create(datas)
+        with batch_recipe_changes():
+            return self.update_recipe(instance, validated_data)
+
+    def update_recipe(self, instance, validated_data):
+        ingredients = validated_data.pop('ingredientinrecipe_set', None)
+        tags = validated_data.pop('tags', None)
+        image = validated_data.pop('image', None)
+        validated_data.pop('author', None)
+        changed = [
+            field for field, value in validated_data.items()
+            if getattr(instance, field) != value
+        ]
+        for field in changed:
+            setattr(instance, field, validated_data[field])
+        image_changed = False
+        if image is not None:
+            old_image = instance.image.name
+            instance.image.save(image.name, image, save=False)
+            image_changed = instance.image.name != old_image
+        if image_changed:
+            instance.image_sizes = {}
+            changed += ['image', 'image_sizes']
+        if changed:
+            instance.save(update_fields=changed)
+        if image_changed:
+            schedule_image_processing(instance)
+        if tags is not None:
+            instance.tags.set(tags)
+        if ingredients is not None:
+            self.update_ingredients(instance, ingredients)
         return instance
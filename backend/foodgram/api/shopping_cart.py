@@ -0,0 +1,147 @@
+import csv
+import io
+import json
+import os
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+from recipes.models import IngredientInRecipe, ShoppingList
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+CART_VERSION_KEY = 'shopping_cart_version:{user_id}'
+CART_FILE_KEY = 'shopping_cart:{user_id}:{version}:{format}'
+CART_FILE_TIMEOUT = 60 * 60 * 24
+CSV_HEADER = ('Ингредиент', 'Единица измерения', 'Количество')
+PDF_FONT_NAME = 'ShoppingListFont'
+
+
+def get_shopping_list(user):
+    return IngredientInRecipe.objects.filter(
+        recipe__recipe_to_shopping__user=user
+    ).values(
+        'ingredient__name', 'ingredient__measurement_unit'
+    ).annotate(
+        total_amount=Sum('amount')
+    ).order_by('ingredient__name')
+
+
+def _rows(shopping_list):
+    for item in shopping_list.iterator():
+        yield (item['ingredient__name'],
+               item['ingredient__measurement_unit'],
+               item['total_amount'])
+
+
+def render_txt(shopping_list):
+    for name, measurement_unit, amount in _rows(shopping_list):
+        yield f"{name}, {measurement_unit} - {amount};\n\n"
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def render_csv(shopping_list):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+    for row in _rows(shopping_list):
+        yield writer.writerow(row)
+
+
+def render_json(shopping_list):
+    separator = '['
+    for name, measurement_unit, amount in _rows(shopping_list):
+        yield separator + json.dumps({
+            'name': name,
+            'measurement_unit': measurement_unit,
+            'amount': amount
+        }, ensure_ascii=False)
+        separator = ','
+    yield '[]' if separator == '[' else ']'
+
+
+def _get_pdf_font():
+    if PDF_FONT_NAME in pdfmetrics.getRegisteredFontNames():
+        return PDF_FONT_NAME
+    font_path = getattr(settings, 'SHOPPING_CART_PDF_FONT', None)
+    if not font_path or not os.path.exists(font_path):
+        return 'Helvetica'
+    pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, font_path))
+    return PDF_FONT_NAME
+
+
+def render_pdf(shopping_list):
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    font = _get_pdf_font()
+    top, bottom, left, line_height = A4[1] - 50, 50, 50, 20
+    pdf.setFont(font, 16)
+    pdf.drawString(left, top, 'Список покупок')
+    y = top - 2 * line_height
+    pdf.setFont(font, 12)
+    for name, measurement_unit, amount in _rows(shopping_list):
+        if y < bottom:
+            pdf.showPage()
+            pdf.setFont(font, 12)
+            y = top
+        pdf.drawString(left, y, f'{name} ({measurement_unit}) — {amount}')
+        y -= line_height
+    pdf.save()
+    yield buffer.getvalue()
+
+
+RENDERERS = {
+    'txt': render_txt,
+    'csv': render_csv,
+    'json': render_json,
+    'pdf': render_pdf,
+}
+
+
+def get_cart_version(user_id):
+    key = CART_VERSION_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_cart_version(*user_ids):
+    cache.set_many({
+        CART_VERSION_KEY.format(user_id=user_id): uuid.uuid4().hex
+        for user_id in user_ids
+    }, None)
+
+
+def bump_recipe_carts(recipe):
+    bump_cart_version(*ShoppingList.objects.filter(
+        recipe=recipe
+    ).values_list('user_id', flat=True))
+
+
+def _cache_chunks(chunks, key):
+    content = []
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        content.append(chunk)
+        yield chunk
+    cache.set(key, b''.join(content), CART_FILE_TIMEOUT)
+
+
+def get_shopping_file(user, format):
+    key = CART_FILE_KEY.format(user_id=user.id,
+                               version=get_cart_version(user.id),
+                               format=format)
+    content = cache.get(key)
+    if content is not None:
+        return content
+    return _cache_chunks(RENDERERS[format](get_shopping_list(user)), key)
@@ -0,0 +1,21 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_cache
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_token(instance, **kwargs):
+    key = instance.key
+    transaction.on_commit(lambda: token_cache.invalidate(key))
+
+
+@receiver((post_save, post_delete), sender=get_user_model())
+def invalidate_user_tokens(instance, **kwargs):
+    keys = list(Token.objects.filter(
+        user_id=instance.id
+    ).values_list('key', flat=True))
+    transaction.on_commit(lambda: token_cache.invalidate(*keys))
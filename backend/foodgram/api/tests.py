@@ -0,0 +1,151 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from recipes.models import (Favorite, Follow, Ingredient,
+                            IngredientIndexChange, IngredientInRecipe, Recipe,
+                            ShoppingList, Tag)
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from users.models import User
+
+from .authentication import token_cache
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class RecipeListQueriesTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Автор', last_name='Рецептов', password='Pass-12345'
+        )
+        cls.reader = User.objects.create_user(
+            email='reader@example.com', username='reader',
+            first_name='Читатель', last_name='Рецептов', password='Pass-12345'
+        )
+        tags = [
+            Tag.objects.create(name=f'Тег {index}', slug=f'tag-{index}',
+                               color=f'#00000{index}')
+            for index in range(2)
+        ]
+        ingredients = [
+            Ingredient.objects.create(name=f'Ингредиент {index}',
+                                      measurement_unit='г')
+            for index in range(3)
+        ]
+        for index in range(12):
+            recipe = Recipe.objects.create(
+                name=f'Рецепт {index}', author=cls.author, text='Текст',
+                cooking_time=10, image='recipes/images/recipe.png'
+            )
+            recipe.tags.set(tags)
+            IngredientInRecipe.objects.bulk_create([
+                IngredientInRecipe(recipe=recipe, ingredient=ingredient,
+                                   amount=index + 1)
+                for ingredient in ingredients
+            ])
+            if index % 2:
+                Favorite.objects.create(user=cls.reader, recipe=recipe)
+                ShoppingList.objects.create(user=cls.reader, recipe=recipe)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def count_queries(self, client, limit):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/recipes/', {'limit': limit})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), limit)
+        return len(queries)
+
+    def assert_constant_queries(self, client):
+        self.assertEqual(self.count_queries(client, 2),
+                         self.count_queries(client, 12))
+
+    def test_anonymous_list_queries_do_not_depend_on_page_size(self):
+        self.assert_constant_queries(APIClient())
+
+    def test_authenticated_list_queries_do_not_depend_on_page_size(self):
+        client = APIClient()
+        client.force_authenticate(self.reader)
+        self.assert_constant_queries(client)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class RecipeUpdateTest(TestCase):
+
+    def setUp(self):
+        self.author = User.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Автор', last_name='Рецептов', password='Pass-12345'
+        )
+        self.ingredients = [
+            Ingredient.objects.create(name=f'Ингредиент {index}',
+                                      measurement_unit='г')
+            for index in range(5)
+        ]
+        self.recipe = Recipe.objects.create(
+            name='Рецепт', author=self.author, text='Текст',
+            cooking_time=10, image='recipes/images/recipe.png'
+        )
+        IngredientInRecipe.objects.bulk_create([
+            IngredientInRecipe(recipe=self.recipe, ingredient=ingredient,
+                               amount=10)
+            for ingredient in self.ingredients
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def test_removed_ingredients_refresh_recipe_once(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self.client.patch(
+                f'/api/recipes/{self.recipe.id}/',
+                {'ingredients': [{'id': self.ingredients[0].id,
+                                  'amount': 20}]},
+                format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(item['id'], item['amount'])
+             for item in response.json()['ingredients']],
+            [(self.ingredients[0].id, 20)]
+        )
+        self.assertEqual(IngredientIndexChange.objects.filter(
+            recipe_id=self.recipe.id
+        ).count(), 1)
+        self.assertEqual(len(callbacks), 3)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TokenCacheTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='reader@example.com', username='reader',
+            first_name='Читатель', last_name='Рецептов', password='Pass-12345'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_logout_revokes_cached_token(self):
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+
+    def test_stats_count_hits_and_misses(self):
+        token_cache.reset_stats()
+        for _ in range(3):
+            self.client.get('/api/users/me/')
+        self.assertEqual(token_cache.stats(),
+                         {'hits': 2, 'misses': 1, 'hit_rate': 0.667})
@@ -1,10 +1,10 @@
 from django.urls import include, path
 from rest_framework import routers
 
-from .views import (add_del_shopping_card, add_del_subscribe,
-                    CustomUserViewSet, favorite_view, get_shopping_card,
-                    IngredientViewSet, ListSubscribeViewSet, RecipeViewSet,
-                    TagViewSet)
+from .views import (add_del_shopping_card, add_del_subscribe, bulk_favorite,
+                    bulk_shopping_card, bulk_subscribe, CustomUserViewSet,
+                    favorite_view, get_shopping_card, IngredientViewSet,
+                    ListSubscribeViewSet, RecipeViewSet, TagViewSet)
 
 router_v1 = routers.DefaultRouter()
 router_v1.register(r'recipes', RecipeViewSet, basename='recipes')
@@ -17,10 +17,15 @@ router_v1.register("users", CustomUserViewSet)
 add_urls = [
     path('recipes/download_shopping_cart/', get_shopping_card,
          name='get_shopping_cart'),
+    path('recipes/shopping_cart/', bulk_shopping_card,
+         name='bulk_shopping_cart'),
+    path('recipes/favorite/', bulk_favorite, name='bulk_favorite'),
     path('recipes/<int:recipe_id>/shopping_cart/', add_del_shopping_card,
          name='add_del_shopping_cart'),
     path('recipes/<int:recipe_id>/favorite/', favorite_view, name='favorite'),
-    path('users/<int:user_id>/subscribe/', add_del_subscribe, name='subscribe')
+    path('users/<int:user_id>/subscribe/', add_del_subscribe,
+         name='subscribe'),
+    path('users/subscribe/', bulk_subscribe, name='bulk_subscribe'),
 ]
 
 
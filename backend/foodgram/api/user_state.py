@@ -0,0 +1,78 @@
+import hashlib
+import time
+from array import array
+from bisect import bisect_left
+
+from django.core.cache import cache
+from recipes.models import Favorite, Follow, ShoppingList
+
+USER_STATE_KEY = 'user_state:{user_id}'
+USER_STATE_TIMEOUT = 60 * 60
+
+
+def _contains(values, value):
+    index = bisect_left(values, value)
+    return index < len(values) and values[index] == value
+
+
+class UserState:
+    def __init__(self, favorites=(), shopping_cart=(), following=()):
+        self.favorites = array('q', sorted(favorites))
+        self.shopping_cart = array('q', sorted(shopping_cart))
+        self.following = array('q', sorted(following))
+        self.loaded_at = time.time()
+
+    @classmethod
+    def load(cls, user_id):
+        return cls(
+            favorites=Favorite.objects.filter(
+                user_id=user_id
+            ).values_list('recipe_id', flat=True),
+            shopping_cart=ShoppingList.objects.filter(
+                user_id=user_id
+            ).values_list('recipe_id', flat=True),
+            following=Follow.objects.filter(
+                user_id=user_id
+            ).values_list('author_id', flat=True),
+        )
+
+    def is_favorited(self, recipe_id):
+        return _contains(self.favorites, recipe_id)
+
+    def is_in_shopping_cart(self, recipe_id):
+        return _contains(self.shopping_cart, recipe_id)
+
+    def is_subscribed(self, author_id):
+        return _contains(self.following, author_id)
+
+    def digest(self):
+        digest = hashlib.md5()
+        for values in (self.favorites, self.shopping_cart, self.following):
+            digest.update(values.tobytes())
+            digest.update(b'|')
+        return digest.hexdigest()
+
+
+ANONYMOUS_STATE = UserState()
+
+
+def get_user_state(request):
+    state = getattr(request, '_user_state', None)
+    if state is not None:
+        return state
+    user = request.user
+    if not user.is_authenticated:
+        return ANONYMOUS_STATE
+    key = USER_STATE_KEY.format(user_id=user.id)
+    state = cache.get(key)
+    if state is None:
+        state = UserState.load(user.id)
+        cache.set(key, state, USER_STATE_TIMEOUT)
+    request._user_state = state
+    return state
+
+
+def reset_user_state(*user_ids):
+    cache.delete_many([
+        USER_STATE_KEY.format(user_id=user_id) for user_id in user_ids
+    ])
@@ -1,47 +1,86 @@
-from django.db.models import Exists, OuterRef, Value
-from django.http import HttpResponse
+from django.db import transaction
+from django.db.models import F, Prefetch
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.conf import settings
 from djoser.views import UserViewSet
 from rest_framework import status, viewsets, permissions
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import (action, api_view, permission_classes,
+                                       renderer_classes)
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
+from . import bulk
+from .conditional import ConditionalResponseMixin
 from .filters import RecipeFilter
+from .paginator import FeedPagination, SearchPagination, TimelinePagination
 from .permissions import IsAuthor
-from .serializers import (CustomUserSerializer, FavoriteSerializer,
-                          FollowSerializer, IngredientSerializer,
-                          TagSerializer, RecipeInputSerializer,
-                          RecipeSerializer, ShoppingCardSerializer)
-from .viewsets import ListRetriveViewSet, ListViewSet
-from recipes.models import (Favorite, Follow, IngredientInRecipe, Ingredient,
-                            Recipe, ShoppingList, Tag)
+from .renderers import CSVRenderer, PDFRenderer, PlainTextRenderer
+from .response_cache import RecipeResponseCacheMixin
+from .serializers import (BulkIdsSerializer, CustomUserSerializer,
+                          FavoriteSerializer, FollowSerializer,
+                          IngredientSearchSerializer,
+                          IngredientSerializer, TagSerializer,
+                          RecipeInputSerializer, RecipeSerializer,
+                          ShoppingCardSerializer, get_recipes_limit)
+from .shopping_cart import (bump_cart_version, bump_recipe_carts,
+                            get_shopping_file)
+from .user_state import get_user_state, reset_user_state
+from .viewsets import CatalogueViewSet, ListViewSet
+from recipes import catalogue
+from recipes.counters import change_counter
+from recipes.ingredient_index import ingredient_index
+from recipes.models import (Favorite, Follow, Ingredient, Recipe,
+                            RecipeNeighbor, RecipeRanking, ShoppingList, Tag,
+                            UserRecommendation)
+from recipes.timelines import (backfill_timeline, get_timeline_sources,
+                               remove_from_timeline, schedule_fan_out)
+from recipes.versions import (get_versions, invalidate_recipe,
+                              version_timestamp)
 from users.models import User
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+def get_limit(request, default, maximum):
+    try:
+        limit = int(request.query_params['limit'])
+    except (KeyError, ValueError):
+        return default
+    return min(max(limit, 1), maximum)
+
+
+class RecipeViewSet(RecipeResponseCacheMixin, viewsets.ModelViewSet):
     filter_backends = (DjangoFilterBackend, )
     filterset_class = RecipeFilter
+    pagination_class = FeedPagination
     ordering = ('-pub_date',)
+    rankings = {
+        'popular': 'ranking__popular_score',
+        'trending': 'ranking__trending_score',
+    }
+    neighbors_limit = 10
+    max_neighbors_limit = 50
+
+    def get_ranking(self):
+        return self.rankings.get(self.request.query_params.get('ordering'))
+
+    @property
+    def keyset_ordering(self):
+        if self.request.query_params.get('search', '').strip():
+            return ('-search_rank', '-id')
+        if self.get_ranking():
+            return ('-rank', '-id')
+        return ('-pub_date', '-id')
 
     def get_queryset(self):
-        user = self.request.user
-        if user.is_authenticated:
-            return Recipe.objects.annotate(
-                is_favorited=Exists(
-                    Favorite.objects.filter(user=user, recipe=OuterRef('pk'))
-                ),
-                is_in_shopping_cart=Exists(
-                    ShoppingList.objects.filter(user=user,
-                                                recipe=OuterRef('pk'))
-                )
-            ).all()
-        return Recipe.objects.annotate(
-            is_favorited=Value(False),
-            is_in_shopping_cart=Value(False)
-        ).all()
+        queryset = Recipe.objects.with_related()
+        ranking = self.get_ranking()
+        if ranking:
+            queryset = queryset.filter(ranking__isnull=False).annotate(
+                rank=F(ranking)
+            ).order_by('-rank', '-id')
+        return queryset
 
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -49,60 +88,169 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return RecipeInputSerializer
 
     def get_permissions(self):
+        if self.action in ('feed', 'recommended'):
+            return (permissions.IsAuthenticated(),)
         if self.request.method in permissions.SAFE_METHODS:
             return (permissions.AllowAny(),)
         return (permissions.IsAuthenticated(), IsAuthor(),)
 
+    @transaction.atomic
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
+        change_counter(User, self.request.user.id, 'recipes_count', 1)
+        invalidate_recipe(serializer.instance.id)
+        schedule_fan_out(serializer.instance)
+        ingredient_index.schedule_refresh(serializer.instance.id)
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        bump_recipe_carts(serializer.instance)
+
+    def perform_destroy(self, instance):
+        bump_recipe_carts(instance)
+        with transaction.atomic():
+            super().perform_destroy(instance)
+            change_counter(User, instance.author_id, 'recipes_count', -1)
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context["request"] = self.request
         return context
 
+    @action(["get"], detail=False)
+    def feed(self, request):
+        paginator = TimelinePagination()
+        page = paginator.paginate_sources(
+            get_timeline_sources(request.user.id),
+            Recipe.objects.with_related(), request, self
+        )
+        serializer = RecipeSerializer(
+            page, many=True, context=self.get_serializer_context()
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    def get_recipes_response(self, recipe_ids):
+        recipes = Recipe.objects.with_related().in_bulk(recipe_ids)
+        serializer = RecipeSerializer(
+            [recipes[pk] for pk in recipe_ids if pk in recipes],
+            many=True, context=self.get_serializer_context()
+        )
+        return Response(serializer.data)
 
-class TagViewSet(ListRetriveViewSet):
+    @action(["get"], detail=False)
+    def by_ingredients(self, request):
+        serializer = IngredientSearchSerializer(data={
+            'ingredients': request.query_params.getlist('ingredients'),
+            'max_missing': request.query_params.get('max_missing'),
+        })
+        serializer.is_valid(raise_exception=True)
+        results = ingredient_index.search(
+            serializer.validated_data['ingredients'],
+            serializer.validated_data.get('max_missing')
+        )
+        paginator = SearchPagination()
+        page = paginator.paginate_queryset(results, request, self)
+        recipes = Recipe.objects.with_related().in_bulk(
+            [recipe_id for _, _, recipe_id in page]
+        )
+        data = RecipeSerializer(
+            [recipes[recipe_id] for _, _, recipe_id in page
+             if recipe_id in recipes],
+            many=True, context=self.get_serializer_context()
+        ).data
+        coverage = {recipe_id: (round(value, 4), missing)
+                    for value, missing, recipe_id in page}
+        for item in data:
+            item['coverage'], item['missing_count'] = coverage[item['id']]
+        return paginator.get_paginated_response(data)
+
+    @action(["get"], detail=True)
+    def similar(self, request, pk=None):
+        try:
+            recipe_id = int(pk)
+        except ValueError:
+            raise Http404
+        neighbor_ids = list(RecipeNeighbor.objects.filter(
+            recipe_id=recipe_id
+        ).order_by('-score').values_list('neighbor_id', flat=True)[
+            :get_limit(request, self.neighbors_limit,
+                       self.max_neighbors_limit)
+        ])
+        if not neighbor_ids:
+            get_object_or_404(Recipe.objects.only('id'), id=recipe_id)
+        return self.get_recipes_response(neighbor_ids)
+
+    @action(["get"], detail=False)
+    def recommended(self, request):
+        limit = get_limit(request, self.neighbors_limit,
+                          self.max_neighbors_limit)
+        state = get_user_state(request)
+        seen = set(state.favorites) | set(state.shopping_cart)
+        recipe_ids = [
+            pk for pk in UserRecommendation.objects.filter(
+                user_id=request.user.id
+            ).order_by('-score').values_list('recipe_id', flat=True)[
+                :limit + len(seen)
+            ] if pk not in seen
+        ][:limit]
+        if not recipe_ids:
+            recipe_ids = [
+                pk for pk in RecipeRanking.objects.order_by(
+                    '-popular_score', '-recipe'
+                ).values_list('recipe_id', flat=True)[:limit + len(seen)]
+                if pk not in seen
+            ][:limit]
+        return self.get_recipes_response(recipe_ids)
+
+
+class TagViewSet(CatalogueViewSet):
+    catalogue = catalogue.tags
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
     ordering = ('id',)
 
 
-class IngredientViewSet(ListRetriveViewSet):
+class IngredientViewSet(CatalogueViewSet):
+    catalogue = catalogue.ingredients
+    queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     pagination_class = None
     ordering = ('id',)
+    search_limit = 10
+    max_search_limit = 50
 
-    def get_queryset(self):
-        name_filter = self.request.query_params.get('name')
-        if name_filter:
-            queryset_1 = Ingredient.objects.filter(
-                name__istartswith=name_filter).annotate(rank=Value(1))
-            queryset_2 = Ingredient.objects.filter(
-                name__icontains=name_filter).annotate(rank=Value(2))
-            return queryset_1.union(queryset_2).order_by('rank')[:10]
-        return Ingredient.objects.all()
+    def get_search_limit(self):
+        return get_limit(self.request, self.search_limit,
+                         self.max_search_limit)
+
+    def list_catalogue(self, request, *args, **kwargs):
+        name_filter = request.query_params.get('name')
+        if not name_filter:
+            return super().list_catalogue(request, *args, **kwargs)
+        serializer = self.get_serializer(
+            catalogue.search_ingredients(name_filter,
+                                         self.get_search_limit()),
+            many=True
+        )
+        return Response(serializer.data)
 
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@renderer_classes([PlainTextRenderer, CSVRenderer, JSONRenderer, PDFRenderer])
 def get_shopping_card(request):
-    ingredients = IngredientInRecipe.objects.filter(
-        recipe__recipe_to_shopping__user=request.user
-    )
-    shopping_data = {}
-    for ingredient in ingredients:
-        if str(ingredient.ingredient) in shopping_data:
-            shopping_data[f'{str(ingredient.ingredient)}'] += ingredient.amount
-        else:
-            shopping_data[f'{str(ingredient.ingredient)}'] = ingredient.amount
-    filename = "shopping-list.txt"
-    content = ''
-    for ingredient, amount in shopping_data.items():
-        content += f"{ingredient} - {amount};\n\n"
-    response = HttpResponse(content, content_type='text/plain',
-                            status=status.HTTP_200_OK)
+    renderer = request.accepted_renderer
+    filename = f"shopping-list.{renderer.format}"
+    content = get_shopping_file(request.user, renderer.format)
+    if isinstance(content, bytes):
+        response = HttpResponse(content, status=status.HTTP_200_OK)
+    else:
+        response = StreamingHttpResponse(content, status=status.HTTP_200_OK)
+    response['Content-Type'] = renderer.media_type
+    if renderer.charset:
+        response['Content-Type'] += f'; charset={renderer.charset}'
     response['Content-Disposition'] = 'attachment; filename={0}'.format(
         filename)
     return response
@@ -117,15 +265,24 @@ def add_del_shopping_card(request, recipe_id):
             context={'request': request, 'recipe_id': recipe_id}
         )
         if serializer.is_valid(raise_exception=True):
-            serializer.save(user=request.user,
-                            recipe=get_object_or_404(Recipe, id=recipe_id))
+            recipe = get_object_or_404(Recipe, id=recipe_id)
+            with transaction.atomic():
+                serializer.save(user=request.user, recipe=recipe)
+                change_counter(Recipe, recipe_id, 'in_carts_count', 1)
+            bump_cart_version(request.user.id)
+            reset_user_state(request.user.id)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response("Ошибка введенных данных",
                         status=status.HTTP_400_BAD_REQUEST)
-    ShoppingList.objects.get(
+    item = ShoppingList.objects.get(
         user=request.user,
         recipe=get_object_or_404(Recipe, id=recipe_id)
-    ).delete()
+    )
+    with transaction.atomic():
+        item.delete()
+        change_counter(Recipe, recipe_id, 'in_carts_count', -1)
+    bump_cart_version(request.user.id)
+    reset_user_state(request.user.id)
     return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -139,25 +296,67 @@ def favorite_view(request, recipe_id):
         )
         if serializer.is_valid(raise_exception=True):
             recipe = get_object_or_404(Recipe, id=recipe_id)
-            serializer.save(user=request.user, recipe=recipe)
+            with transaction.atomic():
+                serializer.save(user=request.user, recipe=recipe)
+                change_counter(Recipe, recipe.id, 'favorites_count', 1)
+            reset_user_state(request.user.id)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response("Ошибка введенных данных",
                         status=status.HTTP_400_BAD_REQUEST)
-    Favorite.objects.get(
+    favorite = Favorite.objects.get(
         user=request.user,
         recipe=get_object_or_404(Recipe, id=recipe_id)
-    ).delete()
+    )
+    with transaction.atomic():
+        favorite.delete()
+        change_counter(Recipe, recipe_id, 'favorites_count', -1)
+    reset_user_state(request.user.id)
     return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+def bulk_response(request, relation):
+    serializer = BulkIdsSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    ids = serializer.validated_data['ids']
+    if request.method == "POST":
+        results = relation.add(request.user, ids)
+    else:
+        results = relation.remove(request.user, ids)
+    return Response({'results': results}, status=status.HTTP_200_OK)
+
+
+@api_view(["POST", "DELETE"])
+@permission_classes([IsAuthenticated])
+def bulk_shopping_card(request):
+    return bulk_response(request, bulk.shopping_cart)
+
+
+@api_view(["POST", "DELETE"])
+@permission_classes([IsAuthenticated])
+def bulk_favorite(request):
+    return bulk_response(request, bulk.favorites)
+
+
 class ListSubscribeViewSet(ListViewSet):
     serializer_class = FollowSerializer
     permission_classes = (IsAuthenticated,)
+    pagination_class = FeedPagination
     ordering = ('id',)
+    keyset_ordering = ('id',)
 
     def get_queryset(self):
-        user = self.request.user
-        return user.follower.all()
+        recipes = Recipe.objects.filter(
+            author__following__user=self.request.user
+        )
+        recipes_limit = get_recipes_limit(self.request)
+        if recipes_limit:
+            recipes = recipes.latest_per_author(recipes_limit)
+        return self.request.user.follower.select_related(
+            'author'
+        ).prefetch_related(
+            Prefetch('author__recipes', queryset=recipes,
+                     to_attr='short_recipes')
+        ).order_by('id')
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -178,7 +377,11 @@ def add_del_subscribe(request, user_id):
             context={'request': request, 'user_id': user_id}
         )
         if serializer.is_valid(raise_exception=True):
-            serializer.save(user=request.user, author=author)
+            with transaction.atomic():
+                serializer.save(user=request.user, author=author)
+                change_counter(User, author.id, 'followers_count', 1)
+            backfill_timeline(request.user.id, author.id)
+            reset_user_state(request.user.id)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response("Ошибка введенных данных",
                         status=status.HTTP_400_BAD_REQUEST)
@@ -187,16 +390,44 @@ def add_del_subscribe(request, user_id):
         context={'request': request, 'user_id': user_id}
     )
     if serializer.is_valid(raise_exception=True):
-        Follow.objects.filter(
-            user=request.user,
-            author=author
-        ).delete()
+        with transaction.atomic():
+            deleted, _ = Follow.objects.filter(
+                user=request.user,
+                author=author
+            ).delete()
+            change_counter(User, author.id, 'followers_count', -deleted)
+        remove_from_timeline(request.user.id, author.id)
+        reset_user_state(request.user.id)
     return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class CustomUserViewSet(UserViewSet):
+@api_view(["POST", "DELETE"])
+@permission_classes([IsAuthenticated])
+def bulk_subscribe(request):
+    return bulk_response(request, bulk.subscriptions)
+
+
+class CustomUserViewSet(ConditionalResponseMixin, UserViewSet):
     serializer_class = CustomUserSerializer
     queryset = User.objects.all()
+    conditional_actions = ('list', 'retrieve', 'me')
+
+    def get_validator_parts(self):
+        user_id = self.kwargs.get(self.lookup_field, self.request.user.id)
+        self.profile_scope = (
+            'author-profiles' if self.action == 'list' else f'user:{user_id}'
+        )
+        self.profile_version = get_versions(
+            self.profile_scope
+        )[self.profile_scope]
+        return [
+            self.profile_scope,
+            self.profile_version,
+            sorted(self.request.query_params.lists()),
+        ]
+
+    def get_last_modified(self):
+        return version_timestamp(self.profile_version)
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -1,4 +1,9 @@
+from django.http import Http404
+from recipes.versions import version_timestamp
 from rest_framework import mixins, viewsets
+from rest_framework.response import Response
+
+from .conditional import ConditionalResponseMixin
 
 
 class ListRetriveViewSet(
@@ -14,3 +19,37 @@ class ListViewSet(
     viewsets.GenericViewSet
 ):
     pass
+
+
+class CatalogueViewSet(ConditionalResponseMixin, ListRetriveViewSet):
+    catalogue = None
+    user_dependent = False
+
+    def get_validator_parts(self):
+        return [
+            self.catalogue.get_version(),
+            self.kwargs.get('pk'),
+            sorted(self.request.query_params.lists()),
+        ]
+
+    def get_last_modified(self):
+        return version_timestamp(self.catalogue.get_version())
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(self.list_catalogue, *args,
+                                         **kwargs)
+
+    def list_catalogue(self, request, *args, **kwargs):
+        return Response(self.catalogue.memoize('list', lambda: list(
+            self.get_serializer(self.catalogue.all(), many=True).data
+        )))
+
+    def get_object(self):
+        try:
+            instance = self.catalogue.get(int(self.kwargs['pk']))
+        except ValueError:
+            instance = None
+        if instance is None:
+            raise Http404
+        self.check_object_permissions(self.request, instance)
+        return instance
@@ -107,13 +107,46 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
 
     'DEFAULT_PAGINATION_CLASS': 'api.paginator.CustomPageNumberPagination',
 
 }
 
+TOKEN_CACHE = {
+    'MAX_SIZE': 10000,
+    'TTL': 60,
+    'SHARED': os.getenv('TOKEN_CACHE_SHARED', default='True') == 'True',
+}
+
 DJOSER = {
     'LOGIN_FIELD': 'email'
 }
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+    }
+}
+
+SHOPPING_CART_PDF_FONT = os.getenv(
+    'SHOPPING_CART_PDF_FONT',
+    default='/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
+RECIPE_IMAGE_MAX_SIZE = 5 * 1024 * 1024
+
+IMAGE_PROCESSING_WORKERS = int(os.getenv('IMAGE_PROCESSING_WORKERS',
+                                         default=2))
+
+TRENDING_HALF_LIFE = int(os.getenv('TRENDING_HALF_LIFE', default=72))
+
+TIMELINE_FANOUT_LIMIT = int(os.getenv('TIMELINE_FANOUT_LIMIT', default=1000))
+TIMELINE_BACKFILL_SIZE = 100
+
+SEARCH_CONFIG = os.getenv('SEARCH_CONFIG', default='russian')
@@ -1,6 +1,5 @@
 from django.contrib import admin
-from django.db.models import Count, OuterRef
-from recipes.models import Favorite, Ingredient, Recipe, Tag
+from recipes.models import Ingredient, Recipe, Tag
 
 
 class TagsInline(admin.TabularInline):
@@ -19,31 +18,18 @@ class RecipeAdmin(admin.ModelAdmin):
         'id',
         'name',
         'author',
-        'favorite_count',
+        'favorites_count',
+        'in_carts_count',
     )
     inlines = (
         TagsInline,
         IngredientsInline
     )
     fields = ('name', 'author', 'image', 'text', 'cooking_time',
-              'favorite_count')
-    readonly_fields = ('favorite_count', )
+              'favorites_count', 'in_carts_count')
+    readonly_fields = ('favorites_count', 'in_carts_count')
     list_filter = ('author', 'name', 'tags')
 
-    def get_queryset(self, request):
-        return Recipe.objects.annotate(
-            favorite_count=Count(
-                Favorite.objects.filter(recipe=OuterRef('pk')).values('id')
-            )
-        )
-
-    @admin.display(
-        ordering='favorite_count',
-        description='Количество добавлений в избранное',
-    )
-    def favorite_count(self, obj):
-        return obj.favorite_count
-
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
@@ -0,0 +1,111 @@
+import threading
+from bisect import bisect_left
+
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import (Case, F, FloatField, Func, IntegerField, Value,
+                              When)
+
+from .models import Ingredient, Tag
+from .versions import new_version
+
+CATALOGUE_VERSION_KEY = 'catalogue_version:{model}'
+
+
+class Catalogue:
+    def __init__(self, model, ordering='id'):
+        self.model = model
+        self.ordering = ordering
+        self.version_key = CATALOGUE_VERSION_KEY.format(
+            model=model._meta.label_lower
+        )
+        self.lock = threading.Lock()
+        self.version = None
+        self.items = []
+        self.by_id = {}
+        self.by_name = []
+        self.memo = {}
+
+    def get_version(self):
+        version = cache.get(self.version_key)
+        if version is None:
+            version = new_version()
+            if not cache.add(self.version_key, version, None):
+                version = cache.get(self.version_key, version)
+        return version
+
+    def invalidate(self):
+        cache.set(self.version_key, new_version(), None)
+
+    def load(self):
+        version = self.get_version()
+        if version == self.version:
+            return
+        with self.lock:
+            if version == self.version:
+                return
+            items = list(self.model.objects.order_by(self.ordering))
+            self.by_id = {item.id: item for item in items}
+            self.by_name = sorted(
+                (item.name.lower(), item.name, item.id) for item in items
+            )
+            self.items = items
+            self.memo = {}
+            self.version = version
+
+    def all(self):
+        self.load()
+        return self.items
+
+    def get(self, pk):
+        self.load()
+        return self.by_id.get(pk)
+
+    def in_bulk(self, ids):
+        self.load()
+        return {pk: self.by_id[pk] for pk in ids if pk in self.by_id}
+
+    def search(self, name, limit):
+        self.load()
+        name = name.lower()
+        found = []
+        position = bisect_left(self.by_name, (name,))
+        while (position < len(self.by_name) and len(found) < limit
+               and self.by_name[position][0].startswith(name)):
+            found.append(self.by_id[self.by_name[position][2]])
+            position += 1
+        for lower_name, _, pk in self.by_name:
+            if len(found) >= limit:
+                break
+            if name in lower_name and not lower_name.startswith(name):
+                found.append(self.by_id[pk])
+        return found
+
+    def memoize(self, key, build):
+        self.load()
+        memo = self.memo
+        if key not in memo:
+            memo[key] = build()
+        return memo[key]
+
+
+ingredients = Catalogue(Ingredient)
+tags = Catalogue(Tag)
+
+
+def get_tag_ids(slugs):
+    by_slug = tags.memoize('by_slug', lambda: {
+        tag.slug: tag.id for tag in tags.all()
+    })
+    return sorted({by_slug[slug] for slug in slugs if slug in by_slug})
+
+
+def search_ingredients(name, limit):
+    if connections[Ingredient.objects.db].vendor != 'postgresql':
+        return ingredients.search(name, limit)
+    return Ingredient.objects.filter(name__icontains=name).annotate(
+        rank=Case(When(name__istartswith=name, then=Value(0)),
+                  default=Value(1), output_field=IntegerField()),
+        similarity=Func(F('name'), Value(name), function='SIMILARITY',
+                        output_field=FloatField())
+    ).order_by('rank', '-similarity', 'name')[:limit]
@@ -0,0 +1,41 @@
+from django.apps import apps
+from django.conf import settings
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+
+def change_counter(model, pk, field, delta):
+    change_counters(model, [pk], field, delta)
+
+
+def change_counters(model, pks, field, delta):
+    if delta and pks:
+        model.objects.filter(pk__in=pks).update(
+            **{field: Greatest(F(field) + delta, 0)}
+        )
+
+
+def count_of(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(
+            **{field: OuterRef('pk')}
+        ).order_by().values(field).annotate(
+            total=Count('pk')
+        ).values('total')
+    ), 0)
+
+
+def rebuild_counters():
+    get_model = apps.get_model
+    recipe_model = get_model('recipes', 'Recipe')
+    user_model = get_model(settings.AUTH_USER_MODEL)
+    recipes = recipe_model.objects.update(
+        favorites_count=count_of(get_model('recipes', 'Favorite'), 'recipe'),
+        in_carts_count=count_of(get_model('recipes', 'ShoppingList'),
+                                'recipe'),
+    )
+    users = user_model.objects.update(
+        recipes_count=count_of(recipe_model, 'author'),
+        followers_count=count_of(get_model('recipes', 'Follow'), 'author'),
+    )
+    return recipes, users
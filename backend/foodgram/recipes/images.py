@@ -0,0 +1,89 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from PIL import Image, ImageOps, features
+
+from .models import Recipe
+from .storage import recipe_image_storage
+from .versions import invalidate_recipe
+
+IMAGE_SIZES = {
+    'thumbnail': (160, 160),
+    'card': (480, 480),
+    'full': (1280, 1280),
+}
+IMAGE_QUALITY = 80
+
+logger = logging.getLogger(__name__)
+executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'IMAGE_PROCESSING_WORKERS', 2),
+    thread_name_prefix='recipe-images'
+)
+
+
+def get_output_format():
+    if features.check('webp'):
+        return 'WEBP', 'webp'
+    return 'JPEG', 'jpg'
+
+
+def render_sizes(name):
+    image_format, ext = get_output_format()
+    stem = os.path.splitext(name)[0]
+    sizes = {size: f'{stem}_{size}.{ext}' for size in IMAGE_SIZES}
+    if all(recipe_image_storage.touch(path) for path in sizes.values()):
+        return sizes
+    with recipe_image_storage.open(name) as file:
+        image = Image.open(file)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image.mode not in ('RGB', 'RGBA') or image_format == 'JPEG':
+        image = image.convert('RGB')
+    for size, box in IMAGE_SIZES.items():
+        if recipe_image_storage.touch(sizes[size]):
+            continue
+        resized = image.copy()
+        resized.thumbnail(box, Image.LANCZOS)
+        buffer = io.BytesIO()
+        resized.save(buffer, image_format, quality=IMAGE_QUALITY)
+        sizes[size] = recipe_image_storage.save_variant(
+            sizes[size], ContentFile(buffer.getvalue())
+        )
+    return sizes
+
+
+def process_recipe_image(recipe_id, name):
+    try:
+        sizes = render_sizes(name)
+        if Recipe.objects.filter(id=recipe_id, image=name).update(
+            image_sizes=sizes
+        ):
+            invalidate_recipe(recipe_id)
+    except Exception:
+        logger.exception('Не удалось обработать изображение %s', name)
+    finally:
+        connections.close_all()
+
+
+def schedule_image_processing(recipe):
+    recipe_id, name = recipe.id, recipe.image.name
+    transaction.on_commit(
+        lambda: executor.submit(process_recipe_image, recipe_id, name)
+    )
+
+
+def get_image_urls(recipe, request=None):
+    if not recipe.image:
+        return None
+    urls = {}
+    for size in IMAGE_SIZES:
+        url = recipe_image_storage.url(
+            recipe.image_sizes.get(size, recipe.image.name)
+        )
+        urls[size] = request.build_absolute_uri(url) if request else url
+    return urls
@@ -0,0 +1,233 @@
+import threading
+from array import array
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Max
+
+from .models import IngredientIndexChange, IngredientInRecipe
+
+CHANGE_OVERLAP = 100
+CHANGE_LOG_SIZE = 10000
+CHANGE_PRUNE_INTERVAL = 1000
+
+
+def popcount(bits):
+    return bin(bits).count('1')
+
+
+def make_bitset(positions, length):
+    bitmap = bytearray((length + 7) // 8)
+    for position in positions:
+        bitmap[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(bitmap, 'little')
+
+
+def count_matches(bitsets):
+    counters = []
+    for carry in bitsets:
+        for index, counter in enumerate(counters):
+            if not carry:
+                break
+            counters[index], carry = counter ^ carry, counter & carry
+        if carry:
+            counters.append(carry)
+    return counters
+
+
+def select_count(bits, counters, count):
+    if count >> len(counters):
+        return 0
+    for index, counter in enumerate(counters):
+        bits &= counter if count >> index & 1 else ~counter
+    return bits
+
+
+def record_change(recipe_id):
+    change = IngredientIndexChange.objects.create(recipe_id=recipe_id)
+    if change.id % CHANGE_PRUNE_INTERVAL == 0:
+        IngredientIndexChange.objects.filter(
+            id__lte=change.id - CHANGE_LOG_SIZE
+        ).delete()
+
+
+class SearchResults:
+    def __init__(self, groups, recipe_ids):
+        self.groups = groups
+        self.recipe_ids = recipe_ids
+        self.sizes = [popcount(bits) for _, _, bits in groups]
+
+    def __len__(self):
+        return sum(self.sizes)
+
+    def __iter__(self):
+        return iter(self[:len(self)])
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop, _ = index.indices(len(self))
+        results = []
+        for (coverage, missing, bits), size in zip(self.groups, self.sizes):
+            if start >= size:
+                start -= size
+                stop -= size
+                continue
+            taken = 0
+            while bits and taken < stop:
+                position = bits.bit_length() - 1
+                bits ^= 1 << position
+                if taken >= start:
+                    results.append(
+                        (coverage, missing, self.recipe_ids[position])
+                    )
+                taken += 1
+            start, stop = 0, stop - taken
+            if stop <= 0:
+                break
+        return results
+
+
+class IngredientIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.last_change = None
+        self.seen_changes = set()
+        self.recipe_ids = array('q')
+        self.positions = {}
+        self.recipe_ingredients = {}
+        self.postings = {}
+        self.sizes = {}
+
+    def get_changes(self, since):
+        return list(IngredientIndexChange.objects.filter(
+            id__gt=since - CHANGE_OVERLAP
+        ).order_by('id').values_list('id', 'recipe_id'))
+
+    def load(self):
+        with self.lock:
+            if self.last_change is None:
+                self.reload()
+                return
+            changes = self.get_changes(self.last_change)
+            if self.last_change and self.last_change not in dict(changes):
+                self.reload()
+                return
+            changes = [(pk, recipe_id) for pk, recipe_id in changes
+                       if pk not in self.seen_changes]
+            if changes:
+                self.apply_changes(changes)
+
+    def reload(self):
+        changes = self.get_changes(
+            IngredientIndexChange.objects.aggregate(last=Max('id'))['last']
+            or 0
+        )
+        recipe_ingredients = defaultdict(list)
+        for recipe_id, ingredient_id in (
+            IngredientInRecipe.objects.order_by(
+                'recipe_id', 'ingredient_id'
+            ).values_list('recipe_id', 'ingredient_id').iterator()
+        ):
+            recipe_ingredients[recipe_id].append(ingredient_id)
+        recipe_ids = array('q', recipe_ingredients)
+        postings = defaultdict(list)
+        sizes = defaultdict(list)
+        for position, recipe_id in enumerate(recipe_ids):
+            ingredient_ids = recipe_ingredients[recipe_id]
+            sizes[len(ingredient_ids)].append(position)
+            for ingredient_id in ingredient_ids:
+                postings[ingredient_id].append(position)
+        self.recipe_ids = recipe_ids
+        self.positions = {
+            recipe_id: position
+            for position, recipe_id in enumerate(recipe_ids)
+        }
+        self.recipe_ingredients = {
+            recipe_id: tuple(ingredient_ids)
+            for recipe_id, ingredient_ids in recipe_ingredients.items()
+        }
+        self.postings = {
+            ingredient_id: make_bitset(positions, len(recipe_ids))
+            for ingredient_id, positions in postings.items()
+        }
+        self.sizes = {
+            size: make_bitset(positions, len(recipe_ids))
+            for size, positions in sizes.items()
+        }
+        self.last_change = max((pk for pk, _ in changes), default=0)
+        self.seen_changes = {pk for pk, _ in changes}
+
+    def apply_changes(self, changes):
+        recipe_ids = {recipe_id for _, recipe_id in changes}
+        ingredients = defaultdict(set)
+        for recipe_id, ingredient_id in IngredientInRecipe.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', 'ingredient_id'):
+            ingredients[recipe_id].add(ingredient_id)
+        for recipe_id in recipe_ids:
+            self.update_recipe(recipe_id,
+                               tuple(sorted(ingredients[recipe_id])))
+        self.last_change = max(self.last_change,
+                               max(pk for pk, _ in changes))
+        self.seen_changes = {
+            pk for pk in self.seen_changes | {pk for pk, _ in changes}
+            if pk > self.last_change - CHANGE_OVERLAP
+        }
+
+    def update_recipe(self, recipe_id, ingredient_ids):
+        position = self.positions.get(recipe_id)
+        if position is None:
+            position = len(self.recipe_ids)
+            self.recipe_ids.append(recipe_id)
+            self.positions[recipe_id] = position
+        bit = 1 << position
+        old_ids = self.recipe_ingredients.get(recipe_id, ())
+        postings = dict(self.postings)
+        for ingredient_id in set(old_ids) - set(ingredient_ids):
+            postings[ingredient_id] &= ~bit
+        for ingredient_id in set(ingredient_ids) - set(old_ids):
+            postings[ingredient_id] = postings.get(ingredient_id, 0) | bit
+        sizes = dict(self.sizes)
+        if old_ids:
+            sizes[len(old_ids)] &= ~bit
+        if ingredient_ids:
+            sizes[len(ingredient_ids)] = sizes.get(len(ingredient_ids),
+                                                   0) | bit
+        recipe_ingredients = dict(self.recipe_ingredients)
+        recipe_ingredients[recipe_id] = ingredient_ids
+        self.postings = postings
+        self.sizes = sizes
+        self.recipe_ingredients = recipe_ingredients
+
+    def schedule_refresh(self, recipe_id):
+        transaction.on_commit(lambda: record_change(recipe_id))
+
+    def search(self, ingredient_ids, max_missing=None):
+        self.load()
+        postings, sizes = self.postings, self.sizes
+        ingredient_ids = set(ingredient_ids)
+        counters = count_matches(
+            postings.get(ingredient_id, 0) for ingredient_id in ingredient_ids
+        )
+        matched = 0
+        for counter in counters:
+            matched |= counter
+        groups = defaultdict(int)
+        for size, members in sizes.items():
+            candidates = members & matched
+            if not candidates:
+                continue
+            lowest = 1 if max_missing is None else max(1, size - max_missing)
+            for count in range(lowest, min(size, len(ingredient_ids)) + 1):
+                bits = select_count(candidates, counters, count)
+                if bits:
+                    groups[count / size, size - count] |= bits
+        return SearchResults(sorted(
+            ((coverage, missing, bits)
+             for (coverage, missing), bits in groups.items()),
+            key=lambda group: (-group[0], group[1])
+        ), self.recipe_ids)
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,18 @@
+from django.core.management import BaseCommand, CommandError
+from recipes.recommendations import build_recommendations
+
+
+class Command(BaseCommand):
+    help = "Builds similar recipe lists and user recommendations"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=20)
+
+    def handle(self, *args, **options):
+        if options['top_k'] < 1:
+            raise CommandError('--top-k должен быть больше 0')
+        recipes, users = build_recommendations(options['top_k'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Built neighbors for {recipes} recipes and recommendations '
+            f'for {users} users'
+        ))
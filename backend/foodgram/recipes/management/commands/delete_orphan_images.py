@@ -0,0 +1,51 @@
+import os
+from datetime import timedelta
+
+from django.core.management import BaseCommand
+from django.utils import timezone
+from recipes.models import Recipe
+
+IMAGE_FIELD = Recipe._meta.get_field('image')
+
+
+def walk(storage, path):
+    directories, files = storage.listdir(path)
+    for name in files:
+        yield os.path.join(path, name)
+    for directory in directories:
+        yield from walk(storage, os.path.join(path, directory))
+
+
+class Command(BaseCommand):
+    help = "Deletes recipe images that are not referenced by any recipe"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-age', type=int, default=60,
+                            help='Minimum file age in minutes')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        storage = IMAGE_FIELD.storage
+        root = IMAGE_FIELD.upload_to
+        if not storage.exists(root):
+            return
+        referenced = set()
+        for image, image_sizes in Recipe.objects.values_list(
+            'image', 'image_sizes'
+        ).iterator():
+            referenced.add(image)
+            referenced.update(image_sizes.values())
+        threshold = timezone.now() - timedelta(minutes=options['min_age'])
+        deleted = freed = 0
+        for name in walk(storage, root):
+            if (name in referenced
+                    or storage.get_modified_time(name) > threshold):
+                continue
+            deleted += 1
+            freed += storage.size(name)
+            if not options['dry_run']:
+                storage.delete(name)
+        self.stdout.write(self.style.SUCCESS(
+            f'{"Dry run: " if options["dry_run"] else ""}'
+            f'deleted {deleted} files, {freed} bytes'
+        ))
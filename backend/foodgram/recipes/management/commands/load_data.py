@@ -1,23 +1,149 @@
-from csv import DictReader
+import csv
+import json
+import os
+import time
+from itertools import islice
 
-from django.core.management import BaseCommand
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from recipes import catalogue
 from recipes.models import Ingredient
 
+DEFAULT_PATH = os.path.join(settings.BASE_DIR, 'recipes', 'data',
+                            'ingredients.csv')
+NAME_MAX_LENGTH = Ingredient._meta.get_field('name').max_length
+UNIT_MAX_LENGTH = Ingredient._meta.get_field('measurement_unit').max_length
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if row == ['name', 'measurement_unit']:
+            continue
+        yield row
+
+
+def read_json(file):
+    decoder = json.JSONDecoder()
+    buffer = file.read(READ_CHUNK_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError('JSON-файл должен содержать список объектов')
+    buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            chunk = file.read(READ_CHUNK_SIZE)
+            if not chunk:
+                raise CommandError('Некорректный JSON-файл')
+            buffer += chunk
+            continue
+        buffer = buffer[end:]
+        if isinstance(item, dict):
+            yield [item.get('name'), item.get('measurement_unit')]
+        else:
+            yield item
+
+
+READERS = {
+    '.csv': read_csv,
+    '.json': read_json,
+}
+
+
+def clean_row(row):
+    if not isinstance(row, list) or len(row) != 2:
+        return None
+    name, measurement_unit = row
+    if not isinstance(name, str) or not isinstance(measurement_unit, str):
+        return None
+    name, measurement_unit = name.strip(), measurement_unit.strip()
+    if (not name or not measurement_unit or len(name) > NAME_MAX_LENGTH
+            or len(measurement_unit) > UNIT_MAX_LENGTH):
+        return None
+    return name, measurement_unit
+
 
 class Command(BaseCommand):
-    help = "Loads data from csv"
+    help = "Loads ingredients from csv or json"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=DEFAULT_PATH)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true')
 
     def handle(self, *args, **options):
+        path = options['path']
+        batch_size = options['batch_size']
+        reader = READERS.get(os.path.splitext(path)[1].lower())
+        if reader is None:
+            raise CommandError(f'Неподдерживаемый формат файла: {path}')
+        if not os.path.exists(path):
+            raise CommandError(f'Файл не найден: {path}')
+        if batch_size < 1:
+            raise CommandError('--batch-size должен быть больше 0')
+
+        self.stdout.write(f'Loading ingredients from {path}')
+        self.created = self.updated = self.unchanged = self.rejected = 0
+        started = time.monotonic()
+        with open(path, encoding='utf-8') as file, transaction.atomic():
+            rows = reader(file)
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                self.load_batch(batch)
+                if options['verbosity'] > 1:
+                    self.stdout.write(
+                        f'  created: {self.created}, updated: '
+                        f'{self.updated}, unchanged: {self.unchanged}, '
+                        f'rejected: {self.rejected}'
+                    )
+            if options['dry_run']:
+                transaction.set_rollback(True)
+            else:
+                transaction.on_commit(catalogue.ingredients.invalidate)
+        elapsed = time.monotonic() - started
+        total = (self.created + self.updated + self.unchanged
+                 + self.rejected)
+        self.stdout.write(self.style.SUCCESS(
+            f'{"Dry run: " if options["dry_run"] else ""}'
+            f'created {self.created}, updated {self.updated}, '
+            f'unchanged {self.unchanged}, rejected {self.rejected} rows '
+            f'in {elapsed:.2f}s '
+            f'({total / elapsed if elapsed else total:.0f} rows/s)'
+        ))
 
-        print("Loading ingredients data")
-        for row in DictReader(
-                open('/app/recipes/data/ingredients.csv', encoding='utf-8')
-        ):
-            try:
-                ingredient = Ingredient(
-                    name=row['name'],
-                    measurement_unit=row['measurement_unit']
-                )
-                ingredient.save()
-            except Exception:
+    def load_batch(self, batch):
+        units = {}
+        for row in batch:
+            row = clean_row(row)
+            if row is None:
+                self.rejected += 1
                 continue
+            units[row[0]] = row[1]
+        existing = Ingredient.objects.filter(name__in=units).only(
+            'id', 'name', 'measurement_unit'
+        )
+        to_update = []
+        unchanged = 0
+        for ingredient in existing:
+            measurement_unit = units.pop(ingredient.name)
+            if ingredient.measurement_unit != measurement_unit:
+                ingredient.measurement_unit = measurement_unit
+                to_update.append(ingredient)
+            else:
+                unchanged += 1
+        Ingredient.objects.bulk_update(to_update, ['measurement_unit'])
+        Ingredient.objects.bulk_create(
+            [Ingredient(name=name, measurement_unit=measurement_unit)
+             for name, measurement_unit in units.items()],
+            ignore_conflicts=True
+        )
+        self.updated += len(to_update)
+        self.unchanged += unchanged
+        self.created += len(units)
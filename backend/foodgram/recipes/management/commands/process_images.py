@@ -0,0 +1,32 @@
+from django.core.management import BaseCommand
+from recipes.images import render_sizes
+from recipes.models import Recipe
+from recipes.versions import invalidate_recipe
+
+
+class Command(BaseCommand):
+    help = "Renders resized recipe images that are missing"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true')
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='').only('id', 'image')
+        if not options['all']:
+            recipes = recipes.filter(image_sizes={})
+        processed = failed = 0
+        for recipe in recipes.iterator():
+            try:
+                sizes = render_sizes(recipe.image.name)
+            except Exception as error:
+                failed += 1
+                self.stderr.write(f'{recipe.image.name}: {error}')
+                continue
+            Recipe.objects.filter(
+                id=recipe.id, image=recipe.image.name
+            ).update(image_sizes=sizes)
+            invalidate_recipe(recipe.id)
+            processed += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {processed} images, failed {failed}'
+        ))
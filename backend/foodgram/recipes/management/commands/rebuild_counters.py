@@ -0,0 +1,14 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+from recipes.counters import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = "Recalculates denormalized recipe and user counters"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            recipes, users = rebuild_counters()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt counters for {recipes} recipes and {users} users'
+        ))
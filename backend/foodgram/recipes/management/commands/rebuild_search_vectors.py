@@ -0,0 +1,12 @@
+from django.core.management import BaseCommand
+from recipes.search import update_search_vectors
+
+
+class Command(BaseCommand):
+    help = "Recalculates full-text search vectors of recipes"
+
+    def handle(self, *args, **options):
+        updated = update_search_vectors()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt search vectors for {updated} recipes'
+        ))
@@ -0,0 +1,31 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+from recipes.models import Follow, TimelineEntry
+from recipes.timelines import backfill_timeline
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds subscription timelines from follows. Needed after follows "
+        "are imported bypassing the API or TIMELINE_BACKFILL_SIZE changes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int)
+
+    def handle(self, *args, **options):
+        follows = Follow.objects.order_by('id')
+        entries = TimelineEntry.objects.all()
+        if options['user']:
+            follows = follows.filter(user_id=options['user'])
+            entries = entries.filter(user_id=options['user'])
+        created = 0
+        with transaction.atomic():
+            entries.delete()
+            for user_id, author_id in follows.values_list(
+                'user_id', 'author_id'
+            ).iterator():
+                created += backfill_timeline(user_id, author_id)
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {created} timeline entries'
+        ))
@@ -0,0 +1,18 @@
+from django.core.management import BaseCommand, CommandError
+from recipes.rankings import refresh_rankings
+
+
+class Command(BaseCommand):
+    help = "Recalculates popular and trending recipe rankings"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше 0')
+        refreshed = refresh_rankings(options['full'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Refreshed rankings for {refreshed} recipes'
+        ))
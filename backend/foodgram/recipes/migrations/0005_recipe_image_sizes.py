@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-17 06:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_ingredient_name_trgm_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_sizes',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Размеры фото'),
+        ),
+    ]
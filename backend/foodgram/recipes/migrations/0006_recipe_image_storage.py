@@ -0,0 +1,19 @@
+# Generated by Django 3.2 on 2026-10-17 06:06
+
+from django.db import migrations, models
+import recipes.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_recipe_image_sizes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(storage=recipes.storage.ContentAddressedStorage(), upload_to='backend-media/recipes/images/', verbose_name='Фото блюда'),
+        ),
+    ]
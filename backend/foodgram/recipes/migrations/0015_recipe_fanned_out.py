@@ -0,0 +1,32 @@
+# Generated by Django 3.2 on 2026-10-17 06:48
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def mark_fanned_out(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    TimelineEntry = apps.get_model('recipes', 'TimelineEntry')
+    Recipe.objects.filter(Exists(TimelineEntry.objects.filter(
+        recipe_id=OuterRef('pk')
+    ))).update(fanned_out=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='fanned_out',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Разослан в ленты подписчиков'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(fanned_out=False), fields=['author', '-pub_date', '-id'], name='recipe_pending_fanout_idx'),
+        ),
+        migrations.RunPython(mark_fanned_out, migrations.RunPython.noop),
+    ]
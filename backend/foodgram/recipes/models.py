@@ -1,8 +1,13 @@
 from colorfield.fields import ColorField
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
 from users.models import User
 
+from .fields import SearchVectorField
+from .storage import recipe_image_storage
+
 
 class Tag(models.Model):
     name = models.CharField('Название тега', unique=True, max_length=200)
@@ -30,6 +35,33 @@ class Ingredient(models.Model):
         return f'{self.name}, {self.measurement_unit}'
 
 
+class RecipeQuerySet(models.QuerySet):
+
+    def with_related(self):
+        return self.select_related('author').prefetch_related(
+            'tags',
+            models.Prefetch(
+                'ingredientinrecipe_set',
+                queryset=IngredientInRecipe.objects.select_related(
+                    'ingredient'
+                )
+            )
+        )
+
+    def latest_per_author(self, limit):
+        ranked = self.annotate(row_number=models.Window(
+            expression=RowNumber(),
+            partition_by=models.F('author'),
+            order_by=(models.F('pub_date').desc(), models.F('id').desc())
+        )).order_by().values('id', 'row_number')
+        sql, params = ranked.query.sql_with_params()
+        return self.filter(id__in=RawSQL(
+            f'SELECT ranked.id FROM ({sql}) ranked '
+            f'WHERE ranked.row_number <= %s',
+            (*params, limit)
+        ))
+
+
 class Recipe(models.Model):
     name = models.CharField('Название рецепта', unique=True, max_length=200)
     author = models.ForeignKey(
@@ -38,8 +70,11 @@ class Recipe(models.Model):
     )
     image = models.ImageField(
         'Фото блюда',
-        upload_to='backend-media/recipes/images/'
+        upload_to='backend-media/recipes/images/',
+        storage=recipe_image_storage
     )
+    image_sizes = models.JSONField('Размеры фото', default=dict,
+                                   blank=True, editable=False)
     text = models.TextField('Рецепт')
     ingredients = models.ManyToManyField(Ingredient,
                                          verbose_name="Ингредиенты",
@@ -54,9 +89,30 @@ class Recipe(models.Model):
     pub_date = models.DateTimeField(
         'Дата добавления', auto_now_add=True, db_index=True
     )
+    favorites_count = models.PositiveIntegerField(
+        'Количество добавлений в избранное', default=0, editable=False
+    )
+    in_carts_count = models.PositiveIntegerField(
+        'Количество добавлений в список покупок', default=0, editable=False
+    )
+    search_vector = SearchVectorField(
+        'Поисковый вектор', null=True, editable=False
+    )
+    fanned_out = models.BooleanField(
+        'Разослан в ленты подписчиков', default=False, editable=False
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(fields=['-favorites_count', '-id'],
+                         name='recipe_popularity_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         condition=models.Q(fanned_out=False),
+                         name='recipe_pending_fanout_idx'),
+        ]
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
 
@@ -78,6 +134,9 @@ class Favorite(models.Model):
                                on_delete=models.CASCADE)
     user = models.ForeignKey(User, related_name='favorite_user',
                              on_delete=models.CASCADE)
+    created = models.DateTimeField(
+        'Дата добавления', auto_now_add=True, db_index=True
+    )
 
     class Meta:
         constraints = [
@@ -86,6 +145,10 @@ class Favorite(models.Model):
                 name='unique_favorite'
             )
         ]
+        indexes = [
+            models.Index(fields=['user', 'recipe'],
+                         name='favorite_user_recipe_idx')
+        ]
         verbose_name = 'Избранный рецепт'
         verbose_name_plural = 'Избранные рецепты'
 
@@ -95,6 +158,9 @@ class ShoppingList(models.Model):
                                on_delete=models.CASCADE)
     user = models.ForeignKey(User, related_name='user_shopping_list',
                              on_delete=models.CASCADE)
+    created = models.DateTimeField(
+        'Дата добавления', auto_now_add=True, db_index=True
+    )
 
     class Meta:
         constraints = [
@@ -103,6 +169,10 @@ class ShoppingList(models.Model):
                 name='unique_shopping_list'
             )
         ]
+        indexes = [
+            models.Index(fields=['user', 'recipe'],
+                         name='shopping_user_recipe_idx')
+        ]
         verbose_name = 'Рецепт в списке покупок'
         verbose_name_plural = 'Рецепты в списке покупок'
 
@@ -122,3 +192,101 @@ class Follow(models.Model):
         ]
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
+
+
+class RecipeRanking(models.Model):
+    recipe = models.OneToOneField(
+        Recipe, on_delete=models.CASCADE, primary_key=True,
+        related_name='ranking', verbose_name='Рецепт'
+    )
+    popular_score = models.PositiveIntegerField('Популярность', default=0)
+    trending_score = models.FloatField('Рейтинг трендов', default=0)
+    updated = models.DateTimeField('Дата пересчёта', null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-popular_score', '-recipe'],
+                         name='ranking_popular_idx'),
+            models.Index(fields=['-trending_score', '-recipe'],
+                         name='ranking_trending_idx'),
+        ]
+        verbose_name = 'Рейтинг рецепта'
+        verbose_name_plural = 'Рейтинги рецептов'
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(User, related_name='timeline',
+                             on_delete=models.CASCADE)
+    recipe = models.ForeignKey(Recipe, related_name='timeline_entries',
+                               on_delete=models.CASCADE)
+    author = models.ForeignKey(User, related_name='+',
+                               on_delete=models.CASCADE)
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe', ],
+                name='unique_timeline_entry'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-recipe'],
+                         name='timeline_feed_idx'),
+            models.Index(fields=['user', 'author'],
+                         name='timeline_author_idx'),
+        ]
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+
+
+class RecipeNeighbor(models.Model):
+    recipe = models.ForeignKey(Recipe, related_name='neighbors',
+                               on_delete=models.CASCADE)
+    neighbor = models.ForeignKey(Recipe, related_name='+',
+                                 on_delete=models.CASCADE)
+    score = models.FloatField('Сходство')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'neighbor', ],
+                name='unique_recipe_neighbor'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['recipe', '-score'],
+                         name='recipe_neighbor_score_idx')
+        ]
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+
+
+class UserRecommendation(models.Model):
+    user = models.ForeignKey(User, related_name='recommendations',
+                             on_delete=models.CASCADE)
+    recipe = models.ForeignKey(Recipe, related_name='+',
+                               on_delete=models.CASCADE)
+    score = models.FloatField('Оценка')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe', ],
+                name='unique_user_recommendation'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['user', '-score'],
+                         name='user_recommendation_score_idx')
+        ]
+        verbose_name = 'Рекомендация'
+        verbose_name_plural = 'Рекомендации'
+
+
+class IngredientIndexChange(models.Model):
+    recipe_id = models.BigIntegerField('Рецепт')
+
+    class Meta:
+        verbose_name = 'Изменение индекса ингредиентов'
+        verbose_name_plural = 'Изменения индекса ингредиентов'
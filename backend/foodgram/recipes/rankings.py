@@ -0,0 +1,95 @@
+import math
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max, Q
+from django.utils import timezone as django_timezone
+
+from .models import Favorite, Recipe, RecipeRanking, ShoppingList
+from .versions import bump_versions
+
+TRENDING_EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+def get_half_life():
+    return getattr(settings, 'TRENDING_HALF_LIFE', 72) * 60 * 60
+
+
+def trending_score(timestamps, half_life):
+    exponents = [
+        (timestamp - TRENDING_EPOCH).total_seconds() / half_life
+        for timestamp in timestamps
+    ]
+    if not exponents:
+        return 0
+    top = max(exponents)
+    return top + math.log2(sum(2 ** (value - top) for value in exponents))
+
+
+def get_changed_recipes(full=False):
+    if full:
+        return set(Recipe.objects.values_list('id', flat=True))
+    changed = set(Recipe.objects.filter(
+        Q(ranking__isnull=True) | Q(ranking__updated__isnull=True)
+        | ~Q(ranking__popular_score=(
+            F('favorites_count') + F('in_carts_count')
+        ))
+    ).values_list('id', flat=True))
+    since = RecipeRanking.objects.aggregate(since=Max('updated'))['since']
+    if since is not None:
+        for model in (Favorite, ShoppingList):
+            changed.update(model.objects.filter(
+                created__gte=since
+            ).values_list('recipe_id', flat=True))
+    return changed
+
+
+def rank_batch(recipe_ids, started, half_life):
+    events = defaultdict(list)
+    for model in (Favorite, ShoppingList):
+        for recipe_id, created in model.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', 'created'):
+            events[recipe_id].append(created)
+    rankings = [
+        RecipeRanking(
+            recipe_id=recipe_id,
+            popular_score=favorites_count + in_carts_count,
+            trending_score=trending_score(events[recipe_id], half_life),
+            updated=started,
+        )
+        for recipe_id, favorites_count, in_carts_count in (
+            Recipe.objects.filter(id__in=recipe_ids).values_list(
+                'id', 'favorites_count', 'in_carts_count'
+            )
+        )
+    ]
+    existing = set(RecipeRanking.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('recipe_id', flat=True))
+    RecipeRanking.objects.bulk_update(
+        [ranking for ranking in rankings if ranking.recipe_id in existing],
+        ['popular_score', 'trending_score', 'updated']
+    )
+    RecipeRanking.objects.bulk_create(
+        [ranking for ranking in rankings
+         if ranking.recipe_id not in existing],
+        ignore_conflicts=True
+    )
+    return len(rankings)
+
+
+def refresh_rankings(full=False, batch_size=1000):
+    started = django_timezone.now()
+    half_life = get_half_life()
+    recipe_ids = sorted(get_changed_recipes(full))
+    refreshed = 0
+    with transaction.atomic():
+        for start in range(0, len(recipe_ids), batch_size):
+            refreshed += rank_batch(recipe_ids[start:start + batch_size],
+                                    started, half_life)
+        if refreshed:
+            transaction.on_commit(lambda: bump_versions('rankings'))
+    return refreshed
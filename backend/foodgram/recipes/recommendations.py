@@ -0,0 +1,114 @@
+import heapq
+import math
+from collections import Counter, defaultdict
+from itertools import islice
+from operator import itemgetter
+
+from django.db import transaction
+
+from .models import (Favorite, IngredientInRecipe, RecipeNeighbor,
+                     ShoppingList, UserRecommendation)
+
+INGREDIENT_WEIGHT = 0.3
+MAX_USER_ITEMS = 500
+MAX_INGREDIENT_RECIPES = 1000
+WRITE_BATCH_SIZE = 1000
+
+
+class CoOccurrence:
+    def __init__(self):
+        self.user_items = defaultdict(set)
+        self.item_users = defaultdict(set)
+        self.recipe_ingredients = defaultdict(set)
+        self.ingredient_recipes = defaultdict(set)
+
+    def load(self):
+        for model in (Favorite, ShoppingList):
+            for user_id, recipe_id in model.objects.values_list(
+                'user_id', 'recipe_id'
+            ).iterator():
+                self.user_items[user_id].add(recipe_id)
+                self.item_users[recipe_id].add(user_id)
+        for recipe_id, ingredient_id in IngredientInRecipe.objects.values_list(
+            'recipe_id', 'ingredient_id'
+        ).iterator():
+            self.recipe_ingredients[recipe_id].add(ingredient_id)
+            self.ingredient_recipes[ingredient_id].add(recipe_id)
+        return self
+
+    def recipe_ids(self):
+        return sorted(set(self.item_users) | set(self.recipe_ingredients))
+
+    def user_scores(self, recipe_id):
+        users = self.item_users[recipe_id]
+        common = Counter()
+        for user_id in users:
+            items = self.user_items[user_id]
+            if len(items) <= MAX_USER_ITEMS:
+                common.update(items)
+        return {
+            other: count / math.sqrt(len(users) * len(self.item_users[other]))
+            for other, count in common.items()
+        }
+
+    def ingredient_scores(self, recipe_id):
+        ingredients = self.recipe_ingredients[recipe_id]
+        common = Counter()
+        for ingredient_id in ingredients:
+            recipes = self.ingredient_recipes[ingredient_id]
+            if len(recipes) <= MAX_INGREDIENT_RECIPES:
+                common.update(recipes)
+        return {
+            other: count / (len(ingredients)
+                            + len(self.recipe_ingredients[other]) - count)
+            for other, count in common.items()
+        }
+
+    def neighbors(self, recipe_id, top_k):
+        scores = Counter(self.user_scores(recipe_id))
+        for other, score in self.ingredient_scores(recipe_id).items():
+            scores[other] += INGREDIENT_WEIGHT * score
+        scores.pop(recipe_id, None)
+        return heapq.nlargest(top_k, scores.items(), key=itemgetter(1))
+
+
+def recommend(neighbors, seeds, top_k):
+    scores = Counter()
+    for recipe_id in seeds:
+        for other, score in neighbors.get(recipe_id, ()):
+            if other not in seeds:
+                scores[other] += score
+    return heapq.nlargest(top_k, scores.items(), key=itemgetter(1))
+
+
+def bulk_insert(model, objs):
+    objs = iter(objs)
+    while True:
+        batch = list(islice(objs, WRITE_BATCH_SIZE))
+        if not batch:
+            return
+        model.objects.bulk_create(batch)
+
+
+def build_recommendations(top_k=20):
+    data = CoOccurrence().load()
+    neighbors = {
+        recipe_id: data.neighbors(recipe_id, top_k)
+        for recipe_id in data.recipe_ids()
+    }
+    with transaction.atomic():
+        RecipeNeighbor.objects.all().delete()
+        bulk_insert(RecipeNeighbor, (
+            RecipeNeighbor(recipe_id=recipe_id, neighbor_id=other,
+                           score=score)
+            for recipe_id, items in neighbors.items()
+            for other, score in items
+        ))
+        UserRecommendation.objects.all().delete()
+        bulk_insert(UserRecommendation, (
+            UserRecommendation(user_id=user_id, recipe_id=recipe_id,
+                               score=score)
+            for user_id, seeds in data.user_items.items()
+            for recipe_id, score in recommend(neighbors, seeds, top_k)
+        ))
+    return len(neighbors), len(data.user_items)
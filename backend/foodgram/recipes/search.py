@@ -0,0 +1,157 @@
+import heapq
+import re
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models import (Case, F, FloatField, TextField, Value,
+                              When)
+from django.db.models.functions import Replace
+from django.utils.html import escape
+
+from .models import IngredientInRecipe
+
+SEARCH_VECTOR_SQL = '''
+    UPDATE recipes_recipe AS recipe SET search_vector =
+        setweight(to_tsvector(%s::regconfig, coalesce(recipe.name, '')), 'A')
+        || setweight(to_tsvector(%s::regconfig, coalesce((
+            SELECT string_agg(ingredient.name, ' ')
+            FROM recipes_ingredientinrecipe AS item
+            JOIN recipes_ingredient AS ingredient
+                ON ingredient.id = item.ingredient_id
+            WHERE item.recipe_id = recipe.id
+        ), '')), 'B')
+        || setweight(to_tsvector(%s::regconfig, coalesce(recipe.text, '')),
+                     'C')
+'''
+FIELD_WEIGHTS = (
+    ('name', 1.0),
+    ('ingredients', 0.4),
+    ('text', 0.1),
+)
+HEADLINE_WORDS = 30
+MAX_FALLBACK_RESULTS = 500
+HIGHLIGHT = '<mark>{0}</mark>'
+HTML_ESCAPES = (
+    ('&', '&amp;'),
+    ('<', '&lt;'),
+    ('>', '&gt;'),
+    ('"', '&quot;'),
+    ("'", '&#x27;'),
+)
+
+
+def get_search_config():
+    return getattr(settings, 'SEARCH_CONFIG', 'russian')
+
+
+def update_search_vectors(recipe_id=None, using=connection):
+    if using.vendor != 'postgresql':
+        return 0
+    sql, params = SEARCH_VECTOR_SQL, [get_search_config()] * 3
+    if recipe_id is not None:
+        sql, params = sql + ' WHERE recipe.id = %s', [*params, recipe_id]
+    with using.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def schedule_search_update(recipe_id):
+    transaction.on_commit(lambda: update_search_vectors(recipe_id))
+
+
+def search_postgresql(queryset, value):
+    from django.contrib.postgres.search import (SearchHeadline, SearchQuery,
+                                                SearchRank)
+
+    config = get_search_config()
+    query = SearchQuery(value, config=config, search_type='websearch')
+    return queryset.filter(search_vector__matches=query).annotate(
+        search_rank=SearchRank(F('search_vector'), query),
+        search_headline=SearchHeadline(
+            escape_expression(F('text')), query, config=config,
+            start_sel='<mark>',
+            stop_sel='</mark>', max_words=HEADLINE_WORDS
+        ),
+    ).order_by('-search_rank', '-id')
+
+
+def escape_expression(expression):
+    for char, entity in HTML_ESCAPES:
+        expression = Replace(expression, Value(char), Value(entity),
+                             output_field=TextField())
+    return expression
+
+
+def get_terms(value):
+    return re.findall(r'\w+', value.lower())
+
+
+def count_matches(words, terms):
+    return sum(word.startswith(term) for word in words for term in terms)
+
+
+def make_headline(text, terms):
+    words = text.split()
+    matches = [
+        index for index, word in enumerate(words)
+        if any(word.lower().strip('.,;:!?()«»"').startswith(term)
+               for term in terms)
+    ]
+    start = max(0, matches[0] - HEADLINE_WORDS // 3) if matches else 0
+    return ' '.join(
+        HIGHLIGHT.format(escape(word)) if index in matches else escape(word)
+        for index, word in enumerate(
+            words[start:start + HEADLINE_WORDS], start
+        )
+    )
+
+
+def search_python(queryset, value):
+    terms = get_terms(value)
+    if not terms:
+        return queryset.none()
+    ingredients = {}
+    for recipe_id, name in IngredientInRecipe.objects.values_list(
+        'recipe_id', 'ingredient__name'
+    ):
+        ingredients.setdefault(recipe_id, []).append(name)
+    ranks, headlines = {}, {}
+    for recipe_id, name, text in queryset.values_list('id', 'name', 'text'):
+        fields = {
+            'name': get_terms(name),
+            'ingredients': get_terms(' '.join(ingredients.get(recipe_id, ()))),
+            'text': get_terms(text),
+        }
+        words = [word for field_words in fields.values()
+                 for word in field_words]
+        if not all(any(word.startswith(term) for word in words)
+                   for term in terms):
+            continue
+        ranks[recipe_id] = sum(
+            weight * count_matches(fields[field], terms)
+            for field, weight in FIELD_WEIGHTS
+        )
+        headlines[recipe_id] = make_headline(text, terms)
+    if not ranks:
+        return queryset.none()
+    ranks = dict(heapq.nlargest(
+        MAX_FALLBACK_RESULTS, ranks.items(), key=itemgetter(1)
+    ))
+    return queryset.filter(id__in=ranks).annotate(
+        search_rank=Case(
+            *(When(id=recipe_id, then=Value(rank))
+              for recipe_id, rank in ranks.items()),
+            output_field=FloatField()
+        ),
+        search_headline=Case(
+            *(When(id=recipe_id, then=Value(headlines[recipe_id]))
+              for recipe_id in ranks)
+        ),
+    ).order_by('-search_rank', '-id')
+
+
+def search_recipes(queryset, value):
+    if connections[queryset.db].vendor == 'postgresql':
+        return search_postgresql(queryset, value)
+    return search_python(queryset, value)
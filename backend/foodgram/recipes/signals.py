@@ -0,0 +1,111 @@
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from users.models import User
+
+from . import catalogue
+from .ingredient_index import ingredient_index
+from .models import (Ingredient, IngredientInRecipe, Recipe, RecipeRanking,
+                     Tag)
+from .search import schedule_search_update
+from .versions import bump_versions, invalidate_recipe
+
+pending = threading.local()
+
+
+def defer_recipe_change(action, recipe_id):
+    actions = getattr(pending, 'actions', None)
+    if actions is None:
+        action(recipe_id)
+    else:
+        actions.setdefault((action, recipe_id))
+
+
+def recipe_rows_changed(recipe_id, ingredients=True):
+    defer_recipe_change(invalidate_recipe, recipe_id)
+    if ingredients:
+        defer_recipe_change(ingredient_index.schedule_refresh, recipe_id)
+        defer_recipe_change(schedule_search_update, recipe_id)
+
+
+@contextmanager
+def batch_recipe_changes():
+    if getattr(pending, 'actions', None) is not None:
+        yield
+        return
+    pending.actions = {}
+    try:
+        yield
+        actions = list(pending.actions)
+    finally:
+        pending.actions = None
+    for action, recipe_id in actions:
+        action(recipe_id)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredients(**kwargs):
+    transaction.on_commit(catalogue.ingredients.invalidate)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_tags(**kwargs):
+    transaction.on_commit(catalogue.tags.invalidate)
+
+
+@receiver((post_save, pre_delete), sender=Recipe)
+def invalidate_recipe_versions(instance, **kwargs):
+    defer_recipe_change(invalidate_recipe, instance.id)
+
+
+@receiver(post_save, sender=Recipe)
+def create_recipe_ranking(instance, created, **kwargs):
+    if created:
+        RecipeRanking.objects.create(recipe=instance)
+
+
+@receiver((post_save, post_delete), sender=Recipe.tags.through)
+def invalidate_recipe_tag_rows(instance, **kwargs):
+    defer_recipe_change(invalidate_recipe, instance.recipe_id)
+
+
+@receiver((post_save, post_delete), sender=IngredientInRecipe)
+def invalidate_ingredient_rows(instance, **kwargs):
+    recipe_rows_changed(instance.recipe_id)
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search_vector(instance, update_fields=None, **kwargs):
+    if update_fields and not {'name', 'text'} & set(update_fields):
+        return
+    defer_recipe_change(schedule_search_update, instance.id)
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_from_ingredient_index(instance, **kwargs):
+    ingredient_index.schedule_refresh(instance.id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags(instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        for recipe_id in pk_set or Recipe.objects.filter(
+            tags=instance
+        ).values_list('id', flat=True):
+            invalidate_recipe(recipe_id, tag_ids=[instance.id])
+        return
+    invalidate_recipe(instance.id, instance.author_id, pk_set or ())
+
+
+@receiver((post_save, post_delete), sender=User)
+def invalidate_author(instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    scopes = ('author-profiles', f'user:{instance.id}')
+    transaction.on_commit(lambda: bump_versions(*scopes))
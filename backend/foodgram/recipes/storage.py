@@ -0,0 +1,39 @@
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def get_content_name(self, name, content):
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        content_hash = digest.hexdigest()
+        ext = os.path.splitext(name)[1].lower()
+        return os.path.join(os.path.dirname(name), content_hash[:2],
+                            content_hash + ext)
+
+    def touch(self, name):
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        name = self.get_content_name(name, content)
+        if self.touch(name):
+            return name
+        return super().save(name, content, max_length)
+
+    def save_variant(self, name, content, max_length=None):
+        return super().save(name, content, max_length)
+
+
+recipe_image_storage = ContentAddressedStorage()
@@ -0,0 +1,83 @@
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from users.models import User
+
+from .models import Ingredient, IngredientInRecipe, Recipe
+from .search import search_recipes
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SearchFallbackTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Автор', last_name='Рецептов', password='Pass-12345'
+        )
+        tomato = Ingredient.objects.create(name='Томаты',
+                                           measurement_unit='г')
+        cls.by_text = cls.create_recipe(
+            'Суп', 'Добавьте томаты в самом конце.'
+        )
+        cls.by_name = cls.create_recipe('Томаты с сыром', 'Нарежьте сыр.')
+        cls.by_ingredient = cls.create_recipe('Салат', 'Перемешайте.')
+        IngredientInRecipe.objects.create(
+            recipe=cls.by_ingredient, ingredient=tomato, amount=100
+        )
+        cls.unsafe = cls.create_recipe(
+            'Паста', 'Сварите пасту <script>alert(1)</script> & подавайте.'
+        )
+        cls.create_recipe('Омлет', 'Взбейте яйца.')
+
+    @classmethod
+    def create_recipe(cls, name, text):
+        return Recipe.objects.create(
+            name=name, author=cls.author, text=text, cooking_time=10,
+            image='recipes/images/recipe.png'
+        )
+
+    def search(self, value):
+        return search_recipes(Recipe.objects.all(), value)
+
+    def test_ranks_name_above_ingredients_above_text(self):
+        self.assertEqual(
+            list(self.search('томат')),
+            [self.by_name, self.by_ingredient, self.by_text]
+        )
+
+    def test_requires_every_term(self):
+        self.assertEqual(list(self.search('томаты сыр')), [self.by_name])
+        self.assertFalse(self.search('томаты омлет').exists())
+        self.assertFalse(self.search('!!!').exists())
+
+    def test_headline_highlights_terms(self):
+        recipe = self.search('томат').get(id=self.by_text.id)
+        self.assertEqual(recipe.search_headline,
+                         'Добавьте <mark>томаты</mark> в самом конце.')
+
+    def test_headline_escapes_text(self):
+        recipe = self.search('пасту').get()
+        self.assertEqual(
+            recipe.search_headline,
+            'Сварите <mark>пасту</mark> &lt;script&gt;alert(1)&lt;/script&gt;'
+            ' &amp; подавайте.'
+        )
+
+    def test_api_returns_headline(self):
+        response = APIClient().get(
+            '/api/recipes/', {'search': 'томат', 'limit': 10}
+        )
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(
+            [recipe['id'] for recipe in results],
+            [self.by_name.id, self.by_ingredient.id, self.by_text.id]
+        )
+        self.assertIn('<mark>томаты</mark>', results[2]['search_headline'])
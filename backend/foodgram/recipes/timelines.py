@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.db import transaction
+from users.models import User
+
+from .models import Follow, Recipe, TimelineEntry
+
+FANOUT_BATCH_SIZE = 1000
+
+
+def get_fanout_limit():
+    return getattr(settings, 'TIMELINE_FANOUT_LIMIT', 1000)
+
+
+def get_backfill_size():
+    return getattr(settings, 'TIMELINE_BACKFILL_SIZE', 100)
+
+
+def is_fanned_out(author_id):
+    return User.objects.filter(
+        id=author_id, followers_count__lte=get_fanout_limit()
+    ).exists()
+
+
+def fan_out_recipe(recipe_id, author_id, pub_date):
+    if not is_fanned_out(author_id):
+        return 0
+    entries = [
+        TimelineEntry(user_id=user_id, recipe_id=recipe_id,
+                      author_id=author_id, pub_date=pub_date)
+        for user_id in Follow.objects.filter(
+            author_id=author_id
+        ).values_list('user_id', flat=True)
+    ]
+    with transaction.atomic():
+        TimelineEntry.objects.bulk_create(
+            entries, batch_size=FANOUT_BATCH_SIZE, ignore_conflicts=True
+        )
+        Recipe.objects.filter(id=recipe_id).update(fanned_out=True)
+    return len(entries)
+
+
+def schedule_fan_out(recipe):
+    args = (recipe.id, recipe.author_id, recipe.pub_date)
+    transaction.on_commit(lambda: fan_out_recipe(*args))
+
+
+def backfill_timeline(user_id, author_id):
+    entries = [
+        TimelineEntry(user_id=user_id, recipe_id=recipe_id,
+                      author_id=author_id, pub_date=pub_date)
+        for recipe_id, pub_date in Recipe.objects.filter(
+            author_id=author_id
+        ).order_by('-pub_date', '-id').values_list(
+            'id', 'pub_date'
+        )[:get_backfill_size()]
+    ]
+    TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+    return len(entries)
+
+
+def remove_from_timeline(user_id, author_id):
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def get_timeline_sources(user_id):
+    follows = Follow.objects.filter(user_id=user_id)
+    big_authors = follows.filter(
+        author__followers_count__gt=get_fanout_limit()
+    ).values('author_id')
+    ordering = ('-pub_date', '-id')
+    return (
+        (TimelineEntry.objects.filter(user_id=user_id),
+         ('-pub_date', '-recipe_id')),
+        (Recipe.objects.filter(author_id__in=big_authors), ordering),
+        (Recipe.objects.filter(
+            author_id__in=follows.values('author_id'), fanned_out=False
+        ), ordering),
+    )
@@ -0,0 +1,54 @@
+import time
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Recipe
+
+VERSION_KEY = 'version:{scope}'
+
+
+def new_version():
+    return f'{time.time():.6f}-{uuid.uuid4().hex}'
+
+
+def version_timestamp(version):
+    try:
+        return float(version.split('-', 1)[0])
+    except ValueError:
+        return time.time()
+
+
+def get_versions(*scopes):
+    keys = {VERSION_KEY.format(scope=scope): scope for scope in scopes}
+    found = cache.get_many(keys)
+    missing = {key: new_version() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return {keys[key]: version for key, version in found.items()}
+
+
+def bump_versions(*scopes):
+    cache.set_many({
+        VERSION_KEY.format(scope=scope): new_version() for scope in scopes
+    }, None)
+
+
+def recipe_scopes(recipe_id, author_id=None, tag_ids=()):
+    scopes = {'recipes', f'recipe:{recipe_id}'}
+    if author_id is not None:
+        scopes.add(f'author:{author_id}')
+    scopes.update(f'tag:{tag_id}' for tag_id in tag_ids if tag_id)
+    return scopes
+
+
+def invalidate_recipe(recipe_id, author_id=None, tag_ids=()):
+    rows = Recipe.objects.filter(id=recipe_id).values_list(
+        'author_id', 'tags__id'
+    )
+    scopes = recipe_scopes(recipe_id, author_id, tag_ids)
+    for row_author_id, tag_id in rows:
+        scopes |= recipe_scopes(recipe_id, row_author_id, [tag_id])
+    transaction.on_commit(lambda: bump_versions(*scopes))
@@ -12,6 +12,8 @@ class CustomUserAdmin(UserAdmin):
         'email',
         'first_name',
         'last_name',
+        'recipes_count',
+        'followers_count',
         'is_active'
     )
     list_editable = ('is_active',)